@@ -3,20 +3,34 @@ KYX Game Build Service
 A standalone Python service that builds pygame games using pygbag and uploads to Supabase.
 """
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import re
 import sys
 import json
 import shutil
 import logging
 import tempfile
+import threading
 import subprocess
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlparse
+from typing import TYPE_CHECKING
 
 from flask import Flask, request, jsonify
-from supabase import create_client, Client
 from flask_cors import CORS
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+from atlas import split_sprite_atlas
+from levels import LEVEL_PACK_NAME, split_level_pack
+from reproducible import normalize_bundle
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,9 +45,59 @@ CORS(app)  # Enable CORS for Next.js app
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 BUILD_SERVICE_SECRET = os.getenv("BUILD_SERVICE_SECRET", "change-me-in-production")
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 300))
+SUPABASE_PREWARM = os.getenv("SUPABASE_PREWARM", "1").lower() not in ("0", "false", "no")
+# Hosts the demo template's sprites may be fetched from (default: the Supabase project, whose storage holds uploads)
+SPRITE_HOSTS = {
+    host.strip()
+    for host in os.getenv("SPRITE_HOSTS", urlparse(SUPABASE_URL or "").hostname or "").split(",")
+    if host.strip()
+}
+
+# Demo template: bundled next to the service in Docker, or the repo's demo-game/ when run from a checkout
+DEMO_TEMPLATE_PATHS = (
+    Path(__file__).parent / "demo-game" / "main.py",
+    Path(__file__).parent.parent / "demo-game" / "main.py",
+)
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# Supabase client is created on first use (or by the prewarm thread) so importing
+# the app stays fast and works without credentials.
+_supabase: "Client" = None
+_supabase_lock = threading.Lock()
+
+
+def get_supabase() -> "Client":
+    """Return the shared Supabase client, creating it on first use."""
+    global _supabase
+    if _supabase is not None:
+        return _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+                raise RuntimeError("Missing SUPABASE_URL or SUPABASE_SERVICE_KEY")
+            started = time.perf_counter()
+            from supabase_client import create_pooled_client
+            imported = time.perf_counter()
+            client = create_pooled_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+            created = time.perf_counter()
+            logger.info(
+                f"Startup report: supabase SDK import {(imported - started) * 1000:.0f}ms, "
+                f"client init {(created - imported) * 1000:.0f}ms"
+            )
+            _supabase = client
+    return _supabase
+
+
+def _prewarm_supabase():
+    """Build the client and open a pooled connection off the request path."""
+    try:
+        started = time.perf_counter()
+        client = get_supabase()
+        from supabase_client import warm_connection
+        warm_connection(client)
+        logger.info(f"Startup report: supabase ready in {(time.perf_counter() - started) * 1000:.0f}ms (prewarm)")
+    except Exception as e:
+        logger.warning(f"Supabase prewarm skipped: {e}")
 
 
 def verify_secret(request_secret: str) -> bool:
@@ -51,7 +115,7 @@ def update_build_status(build_id: str, status: str, error_message: str = None):
         if error_message:
             data["error_message"] = error_message
         
-        supabase.table("build_queue").update(data).eq("id", build_id).execute()
+        get_supabase().table("build_queue").update(data).eq("id", build_id).execute()
         logger.info(f"Updated build {build_id} status to {status}")
     except Exception as e:
         logger.error(f"Failed to update build status: {e}")
@@ -64,31 +128,64 @@ def update_game_status(game_id: str, status: str, bundle_url: str = None):
         if bundle_url:
             data["bundle_url"] = bundle_url
         
-        supabase.table("games").update(data).eq("id", game_id).execute()
+        get_supabase().table("games").update(data).eq("id", game_id).execute()
         logger.info(f"Updated game {game_id} status to {status}")
     except Exception as e:
         logger.error(f"Failed to update game status: {e}")
 
 
-def build_game(build_id: str, game_id: str, config: dict, generated_code: str = None, use_test_game: bool = False, language: str = "python") -> str:
+def workspace_name(game_id: str) -> str:
+    """Build folder name for a game: the same for every rebuild of it, unique across games."""
+    return "kyx-" + re.sub(r"[^A-Za-z0-9_-]+", "-", str(game_id))
+
+
+def build_game(build_id: str, game_id: str, config: dict, generated_code: str = None, use_test_game: bool = False, language: str = "python", timings: dict = None) -> str:
     """
     Build a game and upload to Supabase Storage.
     For Python games: uses pygbag compilation
     For JavaScript games: uploads HTML directly
+    Stage durations in seconds (workspace, pygbag, normalize, upload, cleanup) are
+    logged and written into `timings` when given.
     Returns the bundle URL.
     """
     temp_dir = None
+    timings = {} if timings is None else timings
+    stage_started = time.perf_counter()
+    
+    def finish_stage(name: str):
+        nonlocal stage_started
+        now = time.perf_counter()
+        timings[name] = now - stage_started
+        stage_started = now
     
     try:
         # Create temporary directory
         temp_dir = tempfile.mkdtemp(prefix="kyx-build-")
-        logger.info(f"Created temp directory: {temp_dir}")
+        # pygbag names the archive (and the index.html fields pointing at it) after the folder it
+        # builds in, so build in a folder named after the game instead of the random temp dir
+        workspace = Path(temp_dir) / workspace_name(game_id)
+        workspace.mkdir()
+        logger.info(f"Created workspace: {workspace}")
         logger.info(f"Building {language} game")
         
+        # The demo template reads its rooms from a compiled level pack and its sprites from a
+        # packed atlas; other games get the JSON as-is
+        shipped_config, level_pack, atlas_files = config, None, None
+        if language == "python" and not use_test_game and not generated_code:
+            shipped_config, level_pack = split_level_pack(config)
+            shipped_config, atlas_files = split_sprite_atlas(shipped_config, allowed_hosts=SPRITE_HOSTS)
+        if level_pack is not None:
+            (workspace / LEVEL_PACK_NAME).write_bytes(level_pack)
+            logger.info(f"Wrote {LEVEL_PACK_NAME} ({len(level_pack)} bytes)")
+        if atlas_files is not None:
+            for name, data in atlas_files.items():
+                (workspace / name).write_bytes(data)
+            logger.info(f"Wrote sprite atlas ({len(atlas_files) - 1} pages, {sum(map(len, atlas_files.values()))} bytes)")
+
         # Write game_config.json
-        config_path = Path(temp_dir) / "game_config.json"
+        config_path = workspace / "game_config.json"
         with open(config_path, "w") as f:
-            json.dump(config, f, indent=2)
+            json.dump(shipped_config, f, indent=2, sort_keys=True)
         logger.info("Wrote game_config.json")
         
         # Handle JavaScript games (no compilation needed)
@@ -99,10 +196,11 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
                 raise ValueError("JavaScript game requires generated_code (HTML)")
             
             # Write the HTML file directly
-            index_path = Path(temp_dir) / "index.html"
+            index_path = workspace / "index.html"
             with open(index_path, "w", encoding="utf-8") as f:
                 f.write(generated_code)
             logger.info("Wrote index.html")
+            finish_stage("workspace")
             
             # Upload the HTML file directly to Supabase Storage
             storage_path = f"games/{game_id}/index.html"
@@ -116,7 +214,7 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
             }
             
             try:
-                supabase.storage.from_("game-bundles").upload(
+                get_supabase().storage.from_("game-bundles").upload(
                     storage_path,
                     html_data,
                     file_options=file_options
@@ -124,7 +222,7 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
                 logger.info(f"✅ Upload successful: {storage_path}")
             except Exception as e:
                 logger.warning(f"Upload error (might be upsert conflict): {e}")
-                supabase.storage.from_("game-bundles").update(
+                get_supabase().storage.from_("game-bundles").update(
                     storage_path,
                     html_data,
                     file_options=file_options
@@ -132,12 +230,13 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
                 logger.info(f"✅ Update successful: {storage_path}")
             
             # Get public URL
-            bundle_url = supabase.storage.from_("game-bundles").get_public_url(storage_path)
+            bundle_url = get_supabase().storage.from_("game-bundles").get_public_url(storage_path)
             logger.info(f"JavaScript game bundle URL: {bundle_url}")
+            finish_stage("upload")
             return bundle_url
         
         # Python game: Write main.py and compile with pygbag
-        main_py_path = Path(temp_dir) / "main.py"
+        main_py_path = workspace / "main.py"
         
         # Check if this is a test game build
         if use_test_game:
@@ -155,19 +254,20 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
         else:
             # Use demo game template
             logger.info("Using demo game template")
-            demo_main = Path(__file__).parent / "demo-game" / "main.py"
-            if demo_main.exists():
+            demo_main = next((path for path in DEMO_TEMPLATE_PATHS if path.exists()), None)
+            if demo_main:
                 shutil.copy(demo_main, main_py_path)
             else:
                 raise FileNotFoundError("Demo game template not found")
         
         logger.info("Wrote main.py")
+        finish_stage("workspace")
         
         # Run pygbag build
         logger.info("Starting pygbag build...")
         result = subprocess.run(
             [sys.executable, "-m", "pygbag", "--build", "main.py"],
-            cwd=temp_dir,
+            cwd=workspace,
             capture_output=True,
             text=True,
             timeout=120  # 2 minute timeout
@@ -178,18 +278,24 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
             raise Exception(f"Pygbag build failed: {result.stderr}")
         
         logger.info(f"Pygbag build output: {result.stdout}")
+        finish_stage("pygbag")
         
         # Check for build output
-        build_output = Path(temp_dir) / "build" / "web"
+        build_output = workspace / "build" / "web"
         if not build_output.exists():
             raise FileNotFoundError("Build output directory not found")
         
+        # Normalize timestamps, archive ordering and modes so identical inputs upload identical bytes
+        rewritten = normalize_bundle(build_output)
+        logger.info(f"Normalized build output ({rewritten} archives rewritten)")
+        finish_stage("normalize")
+        
         # Upload all files from build/web directory to Supabase Storage
         logger.info("Uploading build files to Supabase Storage...")
         storage_base = f"games/{game_id}"
         
         # List all files found in build directory
-        all_files = list(build_output.rglob("*"))
+        all_files = sorted(build_output.rglob("*"))
         file_list = [str(f.relative_to(build_output)) for f in all_files if f.is_file()]
         logger.info(f"Found {len(file_list)} files to upload: {file_list}")
         
@@ -233,7 +339,7 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
                 }
                 
                 try:
-                    supabase.storage.from_("game-bundles").upload(
+                    get_supabase().storage.from_("game-bundles").upload(
                         storage_path,
                         file_data,
                         file_options=file_options
@@ -242,7 +348,7 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
                 except Exception as e:
                     logger.warning(f"Upload error (might be upsert conflict): {e}")
                     # If upload fails due to existing file, try update
-                    supabase.storage.from_("game-bundles").update(
+                    get_supabase().storage.from_("game-bundles").update(
                         storage_path,
                         file_data,
                         file_options=file_options
@@ -250,8 +356,9 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
                     logger.info(f"✅ Update successful: {storage_path} -> {content_type}")
         
         # Get public URL for index.html
-        bundle_url = supabase.storage.from_("game-bundles").get_public_url(f"{storage_base}/index.html")
+        bundle_url = get_supabase().storage.from_("game-bundles").get_public_url(f"{storage_base}/index.html")
         logger.info(f"Bundle URL: {bundle_url}")
+        finish_stage("upload")
         
         return bundle_url
         
@@ -260,6 +367,8 @@ def build_game(build_id: str, game_id: str, config: dict, generated_code: str =
         if temp_dir and Path(temp_dir).exists():
             shutil.rmtree(temp_dir, ignore_errors=True)
             logger.info("Cleaned up temp directory")
+        finish_stage("cleanup")
+        logger.info("Build stages: " + ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items()))
 
 
 @app.route("/health", methods=["GET"])
@@ -329,6 +438,20 @@ def process_build():
         }), 500
 
 
+def _report_startup():
+    """Log how long the module took to import and start prewarming the Supabase client."""
+    import_ms = (time.perf_counter() - _IMPORT_STARTED) * 1000
+    if import_ms > IMPORT_TIME_BUDGET_MS:
+        logger.warning(f"Startup report: app import took {import_ms:.0f}ms (budget {IMPORT_TIME_BUDGET_MS:.0f}ms)")
+    else:
+        logger.info(f"Startup report: app import took {import_ms:.0f}ms (budget {IMPORT_TIME_BUDGET_MS:.0f}ms)")
+    if SUPABASE_PREWARM and SUPABASE_URL and SUPABASE_SERVICE_KEY:
+        threading.Thread(target=_prewarm_supabase, name="supabase-prewarm", daemon=True).start()
+
+
+_report_startup()
+
+
 if __name__ == "__main__":
     # Check environment variables
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
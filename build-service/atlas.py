@@ -0,0 +1,231 @@
+"""
+Sprite atlases for the demo game.
+Fetches the sprites a config names under `sprites`, scales each to fit its box, and packs them
+into as few PNG pages as fit, plus an index that demo-game/main.py (`SpriteAtlas`) reads. The
+game then loads and converts one image per page instead of one per sprite, and serves every
+sprite as a subsurface of its page.
+
+Config:
+    "sprites": {"player": "https://.../player.png",
+                "enemy": {"url": "https://.../enemy.png", "width": 48, "height": 48}}
+A sprite is scaled to fit `width` x `height` (default SPRITE_BOXES, else DEFAULT_BOX), keeping
+its aspect ratio. Sources are http(s) URLs, limited to `allowed_hosts` when given, or file paths
+when a `base_dir` is given (the CLI and tools/build_game.py). Sprites that cannot be fetched or
+decoded are left out with a warning, and the game draws those entities itself.
+
+Index (sprites.json):
+    {"version": 1, "pages": ["sprites-0.png", ...],
+     "sprites": {name: [page, x, y, width, height], ...}}
+
+Usage:
+    python atlas.py pack game_config.json out/
+    python atlas.py inspect out/sprites.json
+"""
+
+import io
+import sys
+import json
+import logging
+import argparse
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Collection, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ATLAS_INDEX_NAME = "sprites.json"
+ATLAS_PAGE_NAME = "sprites-{}.png"
+VERSION = 1
+# Largest page edge; sprites that do not fit on one page start another
+PAGE_SIZE = 1024
+# Transparent pixels between packed sprites
+PADDING = 1
+DEFAULT_BOX = (64, 64)
+SPRITE_BOXES = {"player": (48, 64), "enemy": (48, 48)}
+FETCH_TIMEOUT_S = 10.0
+MAX_SPRITE_BYTES = 5 * 1024 * 1024
+# Decoded size limit; a small, highly compressed upload can still claim gigapixel dimensions
+MAX_SPRITE_PIXELS = 2048 * 2048
+
+
+def sprite_specs(config: dict) -> Dict[str, Tuple[str, Tuple[int, int]]]:
+    """{name: (source, (box width, box height))} for the config's well-formed sprite entries."""
+    sprites = config.get("sprites")
+    if not isinstance(sprites, dict):
+        return {}
+    specs = {}
+    for name, entry in sprites.items():
+        box = SPRITE_BOXES.get(name, DEFAULT_BOX)
+        if isinstance(entry, dict):
+            source = entry.get("url")
+            width, height = entry.get("width", box[0]), entry.get("height", box[1])
+            if isinstance(width, (int, float)) and isinstance(height, (int, float)):
+                box = (max(1, min(PAGE_SIZE, int(width))), max(1, min(PAGE_SIZE, int(height))))
+        else:
+            source = entry
+        if isinstance(source, str) and source:
+            specs[name] = (source, box)
+    return specs
+
+
+class _RefuseRedirects(urllib.request.HTTPRedirectHandler):
+    """A redirect could leave the allowed hosts, so it fails the fetch instead."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+_checked_opener = urllib.request.build_opener(_RefuseRedirects)
+
+
+def fetch_sprite(source: str, base_dir: Optional[Path] = None, allowed_hosts: Optional[Collection[str]] = None) -> bytes:
+    """The bytes of an http(s) URL, or of a file path relative to `base_dir` when one is given."""
+    if source.startswith(("http://", "https://")):
+        host = urlparse(source).hostname
+        if allowed_hosts is not None and host not in allowed_hosts:
+            raise ValueError(f"host {host!r} is not allowed")
+        opener = urllib.request.build_opener() if allowed_hosts is None else _checked_opener
+        with opener.open(source, timeout=FETCH_TIMEOUT_S) as response:
+            data = response.read(MAX_SPRITE_BYTES + 1)
+    elif base_dir is None:
+        raise ValueError("not an http(s) URL")
+    else:
+        data = (base_dir / source).read_bytes()
+    if len(data) > MAX_SPRITE_BYTES:
+        raise ValueError(f"larger than {MAX_SPRITE_BYTES} bytes")
+    return data
+
+
+def fit_image(data: bytes, box: Tuple[int, int]):
+    """Decode a sprite as RGBA, scaled to fit `box` with its aspect ratio kept."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    # Image.open only reads the header, so this rejects oversized images before decoding them
+    if image.width * image.height > MAX_SPRITE_PIXELS:
+        raise ValueError(f"{image.width}x{image.height} is larger than {MAX_SPRITE_PIXELS} pixels")
+    image.load()
+    image = image.convert("RGBA")
+    scale = min(box[0] / image.width, box[1] / image.height)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    if size != image.size:
+        # Nearest keeps upscaled pixel art crisp; Lanczos keeps downscaled art smooth
+        resample = Image.Resampling.NEAREST if scale > 1 else Image.Resampling.LANCZOS
+        image = image.resize(size, resample)
+    return image
+
+
+def pack(sizes: Dict[str, Tuple[int, int]]) -> Tuple[list, Dict[str, list]]:
+    """
+    Shelf-pack sprites of the given sizes, tallest first, into pages no larger than
+    PAGE_SIZE. Returns (page sizes, {name: [page, x, y, width, height]}).
+    """
+    order = sorted(sizes, key=lambda name: (-sizes[name][1], -sizes[name][0], name))
+    pages, placed = [], {}
+    x = y = shelf_height = 0
+    for name in order:
+        width, height = sizes[name]
+        if not pages or x + width > PAGE_SIZE:
+            # Next shelf (or first page)
+            if pages:
+                x, y, shelf_height = 0, y + shelf_height + PADDING, 0
+            if not pages or y + height > PAGE_SIZE:
+                pages.append([0, 0])
+                x = y = shelf_height = 0
+        page = len(pages) - 1
+        placed[name] = [page, x, y, width, height]
+        pages[page][0] = max(pages[page][0], x + width)
+        pages[page][1] = max(pages[page][1], y + height)
+        x += width + PADDING
+        shelf_height = max(shelf_height, height)
+    return [tuple(size) for size in pages], placed
+
+
+def build_atlas(
+    config: dict, base_dir: Optional[Path] = None, allowed_hosts: Optional[Collection[str]] = None
+) -> Optional[Dict[str, bytes]]:
+    """
+    Pack the config's sprites. Returns {file name: bytes} for the index and its pages, or
+    None when no sprite could be loaded.
+    """
+    specs = sprite_specs(config)
+    if not specs:
+        return None
+    from PIL import Image
+
+    images = {}
+    for name, (source, box) in specs.items():
+        try:
+            images[name] = fit_image(fetch_sprite(source, base_dir, allowed_hosts), box)
+        except Exception as e:
+            logger.warning(f"Skipping sprite {name!r} ({source}): {e}")
+    if not images:
+        return None
+
+    page_sizes, placed = pack({name: image.size for name, image in images.items()})
+    pages = [Image.new("RGBA", size, (0, 0, 0, 0)) for size in page_sizes]
+    for name, (page, x, y, _, _) in placed.items():
+        pages[page].paste(images[name], (x, y))
+
+    files = {}
+    page_names = []
+    for i, page in enumerate(pages):
+        buffer = io.BytesIO()
+        page.save(buffer, format="PNG", optimize=True)
+        page_names.append(ATLAS_PAGE_NAME.format(i))
+        files[page_names[-1]] = buffer.getvalue()
+    index = {"version": VERSION, "pages": page_names, "sprites": dict(sorted(placed.items()))}
+    files[ATLAS_INDEX_NAME] = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    return files
+
+
+def split_sprite_atlas(
+    config: dict, base_dir: Optional[Path] = None, allowed_hosts: Optional[Collection[str]] = None
+) -> Tuple[dict, Optional[Dict[str, bytes]]]:
+    """
+    Return (config to ship as JSON, atlas files). When any sprite packs, the game reads the
+    atlas and the config ships without its sprite sources; otherwise it ships as-is.
+    """
+    files = build_atlas(config, base_dir, allowed_hosts)
+    if files is None:
+        return config, None
+    return {key: value for key, value in config.items() if key != "sprites"}, files
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pack or inspect demo-game sprite atlases.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack_cmd = commands.add_parser("pack", help="Pack a config's sprites into an atlas.")
+    pack_cmd.add_argument("config", type=Path, help="Game config JSON; sprite paths are relative to it.")
+    pack_cmd.add_argument("output", type=Path, nargs="?", default=Path("."), help="Directory to write the atlas to.")
+    inspect_cmd = commands.add_parser("inspect", help="Summarize an atlas index.")
+    inspect_cmd.add_argument("index", type=Path, help="Atlas index (sprites.json) to read.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    args = parse_args(argv)
+    if args.command == "pack":
+        config = json.loads(args.config.read_text(encoding="utf-8"))
+        files = build_atlas(config, args.config.parent)
+        if files is None:
+            print(f"{args.config} has no sprites to pack", file=sys.stderr)
+            return 1
+        args.output.mkdir(parents=True, exist_ok=True)
+        for name, data in files.items():
+            (args.output / name).write_bytes(data)
+        total = sum(len(data) for data in files.values())
+        print(f"Wrote {ATLAS_INDEX_NAME} and {len(files) - 1} page(s) to {args.output} ({total} bytes)")
+        return 0
+
+    index = json.loads(args.index.read_text(encoding="utf-8"))
+    print(f"{args.index}: version {index['version']}, {len(index['sprites'])} sprites on {len(index['pages'])} page(s)")
+    for name, (page, x, y, width, height) in index["sprites"].items():
+        print(f"  {name:<18} page {page} at ({x}, {y}) {width}x{height}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
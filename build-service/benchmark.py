@@ -0,0 +1,286 @@
+"""
+End-to-end benchmark for build_game with a per-stage breakdown.
+Builds the three real input kinds (JavaScript HTML, test-game.py, demo-game/main.py) against a
+local filesystem stand-in for Supabase and records workspace, pygbag, normalize, upload and
+cleanup times to JSON so runs can be compared across commits.
+
+Usage:
+    python benchmark.py --iterations 5 --json bench/$(git rev-parse --short HEAD).json
+    python benchmark.py --compare bench/baseline.json --fail-on-regression
+    python benchmark.py --iterations 0 --check-reproducible
+"""
+
+import os
+
+# Never open a real Supabase connection from the benchmark.
+os.environ["SUPABASE_PREWARM"] = "0"
+
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import shutil
+import tempfile
+import statistics
+import subprocess
+import importlib.util
+from pathlib import Path
+from datetime import datetime
+
+import app as build_service
+from loadtest import install_fake_pygbag
+from reproducible import diff_builds
+
+KINDS = ("javascript", "test", "demo")
+STAGES = ("workspace", "pygbag", "normalize", "upload", "cleanup", "total")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+JS_TEMPLATE = REPO_ROOT / "landing-page" / "lib" / "template-games" / "base-platformer.ts"
+DEMO_CONFIG = REPO_ROOT / "demo-game" / "game_config.json"
+
+
+class LocalQuery:
+    def __init__(self, supabase, table: str):
+        self.supabase = supabase
+        self.table = table
+        self.data = None
+
+    def update(self, data: dict):
+        self.data = data
+        return self
+
+    def eq(self, column: str, value):
+        self.key = value
+        return self
+
+    def execute(self):
+        self.supabase.rows.setdefault(self.table, {}).setdefault(self.key, {}).update(self.data)
+        return self
+
+
+class LocalBucket:
+    def __init__(self, root: Path):
+        self.root = root
+
+    def upload(self, path: str, data: bytes, file_options: dict = None):
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+    update = upload
+
+    def get_public_url(self, path: str) -> str:
+        return (self.root / path).as_uri()
+
+
+class LocalStorage:
+    def __init__(self, root: Path):
+        self.root = root
+
+    def from_(self, bucket: str) -> LocalBucket:
+        return LocalBucket(self.root / bucket)
+
+
+class LocalSupabase:
+    """Filesystem stand-in: storage writes under `root`, table updates stay in memory."""
+
+    def __init__(self, root: Path):
+        self.storage = LocalStorage(root)
+        self.rows = {}
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+
+def javascript_source() -> str:
+    """The platformer HTML template the lab ships, or a stand-in page outside a checkout."""
+    if JS_TEMPLATE.exists():
+        text = JS_TEMPLATE.read_text(encoding="utf-8")
+        return text[text.index("`") + 1 : text.rindex("`")]
+    return "<!DOCTYPE html><html><body><canvas></canvas><script>/* game */</script></body></html>"
+
+
+def load_config() -> dict:
+    if DEMO_CONFIG.exists():
+        return json.loads(DEMO_CONFIG.read_text(encoding="utf-8"))
+    return {"story": {"title": "Benchmark"}}
+
+
+def build_kwargs(kind: str) -> dict:
+    if kind == "javascript":
+        return {"language": "javascript", "generated_code": javascript_source()}
+    if kind == "test":
+        return {"use_test_game": True}
+    return {}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def describe(samples: list) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {
+        "median_ms": statistics.median(ms),
+        "mean_ms": statistics.fmean(ms),
+        "min_ms": min(ms),
+        "max_ms": max(ms),
+        "stdev_ms": statistics.stdev(ms) if len(ms) > 1 else 0.0,
+    }
+
+
+def run_kind(kind: str, iterations: int, warmup: int, config: dict) -> dict:
+    samples = {stage: [] for stage in STAGES}
+    for i in range(warmup + iterations):
+        timings = {}
+        started = time.perf_counter()
+        build_service.build_game(f"bench-{kind}-{i}", f"bench-{kind}", config, timings=timings, **build_kwargs(kind))
+        timings["total"] = time.perf_counter() - started
+        if i < warmup:
+            continue
+        for stage in STAGES:
+            if stage in timings:
+                samples[stage].append(timings[stage])
+    return {stage: describe(values) for stage, values in samples.items() if values}
+
+
+def check_reproducible(kinds: list, config: dict, scratch: Path) -> list:
+    """Build each kind twice for the same game and return the kinds whose uploads differ."""
+    failures = []
+    for kind in kinds:
+        game_id = f"repro-{kind}"
+        uploaded = scratch / "storage" / "game-bundles" / "games" / game_id
+        builds = []
+        for attempt in range(2):
+            build_service.build_game(f"repro-{kind}-{attempt}", game_id, config, **build_kwargs(kind))
+            builds.append(Path(shutil.copytree(uploaded, scratch / "repro" / f"{kind}-{attempt}")))
+            shutil.rmtree(uploaded)
+        diffs = diff_builds(*builds)
+        print(f"  {kind:<10} {'byte-identical' if not diffs else f'{len(diffs)} differences'}")
+        for line in diffs:
+            print(f"    {line}")
+        if diffs:
+            failures.append(kind)
+    return failures
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """Return regressions where a stage median grew by more than `threshold` (and `min_delta_ms`)."""
+    regressions = []
+    for kind, stages in current["results"].items():
+        for stage, stats in stages.items():
+            base = baseline.get("results", {}).get(kind, {}).get(stage)
+            if not base:
+                continue
+            delta = stats["median_ms"] - base["median_ms"]
+            ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+            marker = ""
+            if ratio > 1 + threshold and delta > min_delta_ms:
+                marker = "  REGRESSION"
+                regressions.append(f"{kind}.{stage}")
+            print(
+                f"  {kind:<10} {stage:<9} {base['median_ms']:9.1f}ms -> {stats['median_ms']:9.1f}ms "
+                f"({ratio - 1:+.1%}){marker}"
+            )
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark build_game stage by stage.")
+    parser.add_argument("--kinds", type=str, default=",".join(KINDS), help="Comma-separated kinds: javascript,test,demo.")
+    parser.add_argument("--iterations", type=int, default=5, help="Measured builds per kind.")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured builds per kind before timing.")
+    parser.add_argument(
+        "--toolchain",
+        choices=("auto", "real", "fake"),
+        default="auto",
+        help="Run real pygbag, the load-test fake, or real when installed (default).",
+    )
+    parser.add_argument("--fake-pygbag-ms", type=float, default=500.0, help="Median build time for the fake toolchain.")
+    parser.add_argument("--json", type=Path, default=None, help="Write results to this JSON file.")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline JSON from an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that counts as a regression.")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore slowdowns smaller than this.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 when --compare finds regressions.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the build service's INFO logs.")
+    parser.add_argument(
+        "--check-reproducible",
+        action="store_true",
+        help="Also build each kind twice for one game and exit 1 unless the uploads are byte-identical.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    for kind in kinds:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind: {kind}")
+    if not args.verbose:
+        logging.getLogger(build_service.__name__).setLevel(logging.WARNING)
+
+    toolchain = args.toolchain
+    if toolchain == "auto":
+        toolchain = "real" if importlib.util.find_spec("pygbag") else "fake"
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "toolchain": toolchain,
+        "iterations": args.iterations,
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="kyx-bench-") as scratch:
+        scratch = Path(scratch)
+        if toolchain == "fake":
+            # No spread, so fake runs compare stage overheads rather than random build times
+            install_fake_pygbag(scratch / "toolchain", median_ms=args.fake_pygbag_ms, sigma=0.0)
+        build_service._supabase = LocalSupabase(scratch / "storage")
+        config = load_config()
+
+        print(f"Benchmark: commit={report['commit']} toolchain={toolchain} iterations={args.iterations}")
+        for kind in kinds:
+            results = run_kind(kind, args.iterations, args.warmup, config)
+            report["results"][kind] = results
+            breakdown = "  ".join(f"{stage}={stats['median_ms']:.1f}ms" for stage, stats in results.items())
+            print(f"  {kind:<10} {breakdown}")
+
+        if args.check_reproducible:
+            print("Reproducibility (two builds per kind, reproducible.diff_builds):")
+            if check_reproducible(kinds, config, scratch):
+                return 1
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.json}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"Compared with {args.compare} (commit {baseline.get('commit', 'unknown')}, medians):")
+        if baseline.get("toolchain") != toolchain:
+            print(f"  Warning: baseline used the {baseline.get('toolchain')} toolchain, this run used {toolchain}")
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Compiled level packs for the demo game.
+Turns the `rooms` list of a game config into `levels.bin`: a versioned header followed by
+packed column arrays that demo-game/main.py (`load_level_pack`) maps straight into its room
+specs. The JSON the bundle ships keeps everything except the rooms; a bundle without a
+usable pack falls back to the rooms in its JSON.
+
+Layout (little-endian):
+    header  "<4sHHI"  magic b"KYXL", version, flags (0), column count
+    column  "<cI"     array typecode ("I", "i" or "d"), item count, then the items
+Columns, in order: room_platform_end, platform_x, platform_y, platform_width,
+platform_height, enemy_room_end, enemy_x, enemy_y, enemy_speed. The *_end columns are
+running totals that split the flat columns per room. Platforms belong to the rooms the game
+keeps (those with at least one complete platform); enemy lists follow the config's room
+positions, as the JSON loader matches them. A missing enemy speed is stored as NaN.
+Tilemap rooms (rooms with "tiles" rows) are already compact and have no place in the
+layout, so configs that use them are not compiled and ship their rooms as JSON.
+
+Usage:
+    python levels.py compile game_config.json levels.bin
+    python levels.py inspect levels.bin
+"""
+
+import sys
+import json
+import math
+import struct
+import argparse
+from array import array
+from pathlib import Path
+from typing import Optional, Tuple
+
+LEVEL_PACK_NAME = "levels.bin"
+MAGIC = b"KYXL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+COLUMN = struct.Struct("<cI")
+COLUMNS = (
+    "room_platform_end",
+    "platform_x",
+    "platform_y",
+    "platform_width",
+    "platform_height",
+    "enemy_room_end",
+    "enemy_x",
+    "enemy_y",
+    "enemy_speed",
+)
+PLATFORM_KEYS = ("x", "y", "width", "height")
+INT32_RANGE = (-(2**31), 2**31 - 1)
+
+
+def _number(value, where: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{where} must be a number, got {value!r}")
+    return value
+
+
+def _pack_column(values: list, typecode: str = None) -> bytes:
+    """Pack one column, as int32 when every value is a whole number that fits, else float64."""
+    if typecode is None:
+        integral = all(
+            isinstance(v, int) or (math.isfinite(v) and v == int(v)) for v in values
+        ) and all(INT32_RANGE[0] <= v <= INT32_RANGE[1] for v in values)
+        typecode = "i" if integral else "d"
+        if integral:
+            values = [int(v) for v in values]
+    items = array(typecode, values)
+    if sys.byteorder == "big":
+        items.byteswap()
+    return COLUMN.pack(typecode.encode("ascii"), len(items)) + items.tobytes()
+
+
+def compile_levels(config: dict) -> Optional[bytes]:
+    """Compile a config's rooms into a level pack, or None when it has no usable rooms."""
+    rooms = config.get("rooms")
+    if not isinstance(rooms, list):
+        return None
+
+    platform_end, platforms = [], {key: [] for key in PLATFORM_KEYS}
+    enemy_end, enemy_x, enemy_y, enemy_speed = [], [], [], []
+    for i, room in enumerate(rooms):
+        if not isinstance(room, dict):
+            raise ValueError(f"rooms[{i}] must be an object")
+        if "tiles" in room:
+            raise ValueError(f"rooms[{i}] is a tilemap room; level packs only hold platform rooms")
+        complete = [p for p in room.get("platforms", []) if all(k in p for k in PLATFORM_KEYS)]
+        for p in complete:
+            for key in PLATFORM_KEYS:
+                platforms[key].append(_number(p[key], f"rooms[{i}] platform {key}"))
+        if complete:
+            platform_end.append(len(platforms["x"]))
+
+        for enemy in room.get("enemies", []):
+            if "x" in enemy and "y" in enemy:
+                enemy_x.append(_number(enemy["x"], f"rooms[{i}] enemy x"))
+                enemy_y.append(_number(enemy["y"], f"rooms[{i}] enemy y"))
+                speed = enemy.get("speed")
+                enemy_speed.append(math.nan if speed is None else float(_number(speed, f"rooms[{i}] enemy speed")))
+        enemy_end.append(len(enemy_x))
+
+    if not platform_end:
+        return None
+    columns = [
+        _pack_column(platform_end, "I"),
+        *(_pack_column(platforms[key]) for key in PLATFORM_KEYS),
+        _pack_column(enemy_end, "I"),
+        _pack_column(enemy_x),
+        _pack_column(enemy_y),
+        _pack_column(enemy_speed, "d"),
+    ]
+    return HEADER.pack(MAGIC, VERSION, 0, len(columns)) + b"".join(columns)
+
+
+def read_pack(data: bytes) -> dict:
+    """Unpack a level pack into {column name: array}; raises ValueError if it is not one."""
+    if len(data) < HEADER.size:
+        raise ValueError("Level pack is truncated")
+    magic, version, _, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a level pack")
+    if version != VERSION or count != len(COLUMNS):
+        raise ValueError(f"Unsupported level pack version {version}")
+    offset = HEADER.size
+    columns = {}
+    for name in COLUMNS:
+        typecode, length = COLUMN.unpack_from(data, offset)
+        offset += COLUMN.size
+        items = array(typecode.decode("ascii"))
+        end = offset + length * items.itemsize
+        if end > len(data):
+            raise ValueError("Level pack is truncated")
+        items.frombytes(data[offset:end])
+        if sys.byteorder == "big":
+            items.byteswap()
+        columns[name] = items
+        offset = end
+    return columns
+
+
+def split_level_pack(config: dict) -> Tuple[dict, Optional[bytes]]:
+    """
+    Return (config to ship as JSON, level pack). When the rooms compile, they move into the
+    pack; otherwise (no rooms, or rooms the compiler rejects) the config is returned as-is
+    with no pack, and the game reads the rooms from JSON.
+    """
+    try:
+        pack = compile_levels(config)
+    except (ValueError, TypeError, AttributeError):
+        return config, None
+    if pack is None:
+        return config, None
+    return {key: value for key, value in config.items() if key != "rooms"}, pack
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compile or inspect demo-game level packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = commands.add_parser("compile", help="Compile a config's rooms into a level pack.")
+    compile_cmd.add_argument("config", type=Path, help="Game config JSON.")
+    compile_cmd.add_argument("output", type=Path, nargs="?", default=Path(LEVEL_PACK_NAME), help="Pack to write.")
+    inspect_cmd = commands.add_parser("inspect", help="Summarize a level pack.")
+    inspect_cmd.add_argument("pack", type=Path, help="Level pack to read.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.command == "compile":
+        config = json.loads(args.config.read_text(encoding="utf-8"))
+        pack = compile_levels(config)
+        if pack is None:
+            print(f"{args.config} has no rooms to compile", file=sys.stderr)
+            return 1
+        args.output.write_bytes(pack)
+        source_size = len(json.dumps(config.get("rooms"), separators=(",", ":")))
+        print(f"Wrote {args.output}: {len(pack)} bytes ({source_size} bytes of compact JSON rooms)")
+        return 0
+
+    columns = read_pack(args.pack.read_bytes())
+    rooms = len(columns["room_platform_end"])
+    print(
+        f"{args.pack}: version {VERSION}, {rooms} rooms, {len(columns['platform_x'])} platforms, "
+        f"{len(columns['enemy_x'])} enemies"
+    )
+    for name, items in columns.items():
+        print(f"  {name:<18} {items.typecode} x {len(items)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+Load-test harness for the KYX Build Service.
+Drives POST /build in-process at a Poisson arrival rate against a fake Supabase and a fake
+pygbag toolchain, then reports throughput, latency percentiles and failure rates.
+
+Nothing here touches real Supabase or runs real pygbag builds.
+
+Usage:
+    python loadtest.py --rate 2 --duration 30 --workers 2
+    python loadtest.py --rates 0.5,1,2,4 --duration 20 --workers 4 --time-scale 0.1 --json results.json
+"""
+
+import os
+
+# Never open a real Supabase connection from the harness.
+os.environ["SUPABASE_PREWARM"] = "0"
+
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import app as build_service
+
+DEFAULT_MIX = "javascript=0.4,test=0.2,demo=0.1,generated=0.3"
+
+# Median latencies (ms) and lognormal spread for the fakes, roughly matching production logs.
+FAKE_LATENCIES = {
+    "table_update": (45, 0.35),
+    "storage_upload": (120, 0.45),
+    "public_url": (1, 0.1),
+    "pygbag": (7000, 0.3),
+}
+FAKE_UPLOAD_BANDWIDTH = 25 * 1024 * 1024  # bytes per second
+
+FAKE_PYGBAG = '''
+import os, sys, math, time, random, zipfile
+from pathlib import Path
+
+scale = float(os.environ["FAKE_PYGBAG_TIME_SCALE"])
+median = float(os.environ["FAKE_PYGBAG_MEDIAN_MS"]) / 1000 * scale
+sigma = float(os.environ["FAKE_PYGBAG_SIGMA"])
+cpu_fraction = float(os.environ["FAKE_PYGBAG_CPU_FRACTION"])
+fail_rate = float(os.environ["FAKE_PYGBAG_FAIL_RATE"])
+
+duration = random.lognormvariate(math.log(median), sigma)
+busy_until = time.perf_counter() + duration * cpu_fraction
+while time.perf_counter() < busy_until:
+    pass
+time.sleep(duration * (1 - cpu_fraction))
+
+if random.random() < fail_rate:
+    print("fake pygbag: simulated build failure", file=sys.stderr)
+    sys.exit(1)
+
+# Like pygbag, name the archive after the build folder and point index.html at it
+app_name = Path.cwd().name
+web = Path("build") / "web"
+web.mkdir(parents=True)
+(web / "index.html").write_text(f"<html><body data-apk='{app_name}.apk'>fake pygbag bundle</body></html>" * 300)
+(web / "favicon.png").write_bytes(random.Random(app_name).randbytes(20 * 1024))
+with zipfile.ZipFile(web / f"{app_name}.apk", "w", zipfile.ZIP_DEFLATED) as apk:
+    for name in sorted(os.listdir(".")):
+        if os.path.isfile(name):
+            apk.write(name, f"assets/{name}")
+print("fake pygbag: build complete")
+'''
+
+SAMPLE_HTML = "<!DOCTYPE html><html><body><canvas id='game'></canvas><script>/* game */</script></body></html>"
+SAMPLE_CODE = (Path(__file__).parent / "test-game.py").read_text(encoding="utf-8")
+
+
+class Latency:
+    """Lognormal latency source shared by the fakes."""
+
+    def __init__(self, time_scale: float, fail_rate: float, seed: int = None):
+        self.time_scale = time_scale
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self, operation: str, payload_bytes: int = 0):
+        median_ms, sigma = FAKE_LATENCIES[operation]
+        with self._lock:
+            seconds = self._random.lognormvariate(math.log(median_ms / 1000), sigma)
+            failed = self._random.random() < self.fail_rate
+        seconds += payload_bytes / FAKE_UPLOAD_BANDWIDTH
+        time.sleep(seconds * self.time_scale)
+        if failed:
+            raise RuntimeError(f"fake supabase: simulated {operation} failure")
+
+
+class FakeQuery:
+    def __init__(self, supabase, table: str):
+        self.supabase = supabase
+        self.table = table
+        self.data = None
+
+    def update(self, data: dict):
+        self.data = data
+        return self
+
+    def eq(self, column: str, value):
+        self.key = (column, value)
+        return self
+
+    def execute(self):
+        self.supabase.latency.wait("table_update")
+        self.supabase.record("table_update")
+        return self
+
+
+class FakeBucket:
+    def __init__(self, supabase, bucket: str):
+        self.supabase = supabase
+        self.bucket = bucket
+
+    def upload(self, path: str, data: bytes, file_options: dict = None):
+        self.supabase.latency.wait("storage_upload", len(data))
+        self.supabase.record("storage_upload", len(data))
+
+    update = upload
+
+    def get_public_url(self, path: str) -> str:
+        self.supabase.latency.wait("public_url")
+        return f"https://fake.supabase.local/storage/v1/object/public/{self.bucket}/{path}"
+
+
+class FakeStorage:
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self.supabase, bucket)
+
+
+class FakeSupabase:
+    """In-process stand-in for the few Supabase calls the build service makes."""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.storage = FakeStorage(self)
+        self.calls = {}
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def record(self, operation: str, payload_bytes: int = 0):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            self.bytes_uploaded += payload_bytes
+
+
+def install_fake_pygbag(scratch: Path, time_scale: float = 1.0, median_ms: float = None, cpu_fraction: float = 0.7, fail_rate: float = 0.0, sigma: float = None) -> None:
+    """Put a fake `pygbag` package first on PYTHONPATH so `python -m pygbag` runs it instead."""
+    package = scratch / "pygbag"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "__main__.py").write_text(FAKE_PYGBAG)
+    default_median_ms, default_sigma = FAKE_LATENCIES["pygbag"]
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [str(scratch), os.environ.get("PYTHONPATH")]))
+    os.environ["FAKE_PYGBAG_TIME_SCALE"] = str(time_scale)
+    os.environ["FAKE_PYGBAG_MEDIAN_MS"] = str(median_ms or default_median_ms)
+    os.environ["FAKE_PYGBAG_SIGMA"] = str(default_sigma if sigma is None else sigma)
+    os.environ["FAKE_PYGBAG_CPU_FRACTION"] = str(cpu_fraction)
+    os.environ["FAKE_PYGBAG_FAIL_RATE"] = str(fail_rate)
+
+
+def parse_mix(raw: str) -> list:
+    mix = []
+    for part in raw.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("javascript", "test", "demo", "generated"):
+            raise ValueError(f"Unknown build kind in mix: {kind}")
+        mix.append((kind, float(weight or 1)))
+    return mix
+
+
+def build_payload(kind: str, index: int) -> dict:
+    payload = {
+        "buildId": f"load-build-{index}",
+        "gameId": f"load-game-{index}",
+        "config": {"story": {"title": f"Load Test {index}"}},
+    }
+    if kind == "javascript":
+        payload["language"] = "javascript"
+        payload["generatedCode"] = SAMPLE_HTML
+    elif kind == "test":
+        payload["use_test_game"] = True
+    elif kind == "generated":
+        payload["generatedCode"] = SAMPLE_CODE
+    return payload
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: list, wall_seconds: float) -> dict:
+    ok = [s for s in samples if s["ok"]]
+    latencies = [s["latency"] for s in ok]
+    summary = {
+        "requests": len(samples),
+        "succeeded": len(ok),
+        "failed": len(samples) - len(ok),
+        "failure_rate": (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+        "throughput_rps": len(ok) / wall_seconds if wall_seconds else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000 if latencies else 0.0,
+        },
+        "queue_wait_ms_p95": percentile([s["queue_wait"] for s in samples], 95) * 1000,
+        "by_kind": {},
+    }
+    for kind in sorted({s["kind"] for s in samples}):
+        kind_samples = [s for s in samples if s["kind"] == kind]
+        kind_ok = [s["latency"] for s in kind_samples if s["ok"]]
+        summary["by_kind"][kind] = {
+            "requests": len(kind_samples),
+            "failed": len(kind_samples) - len(kind_ok),
+            "p50_ms": percentile(kind_ok, 50) * 1000,
+            "p95_ms": percentile(kind_ok, 95) * 1000,
+        }
+    return summary
+
+
+def run_stage(rate: float, args, mix: list, rng: random.Random) -> dict:
+    """Open-loop Poisson arrivals at `rate` req/s for `duration` seconds on `workers` workers."""
+    client = build_service.app.test_client()
+    headers = {"X-Build-Secret": build_service.BUILD_SERVICE_SECRET}
+    kinds = [kind for kind, _ in mix]
+    weights = [weight for _, weight in mix]
+    samples = []
+    samples_lock = threading.Lock()
+
+    def handle(index: int, kind: str, arrived: float):
+        started = time.perf_counter()
+        response = client.post("/build", json=build_payload(kind, index), headers=headers)
+        finished = time.perf_counter()
+        with samples_lock:
+            samples.append({
+                "kind": kind,
+                "ok": response.status_code == 200,
+                "latency": finished - arrived,
+                "queue_wait": started - arrived,
+            })
+
+    stage_started = time.perf_counter()
+    next_arrival = stage_started
+    index = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while next_arrival - stage_started < args.duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind = rng.choices(kinds, weights)[0]
+            pool.submit(handle, index, kind, next_arrival)
+            index += 1
+            next_arrival += rng.expovariate(rate)
+    wall = time.perf_counter() - stage_started
+
+    summary = summarize(samples, wall)
+    summary["offered_rate_rps"] = rate
+    summary["workers"] = args.workers
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    lat = summary["latency_ms"]
+    print(
+        f"rate={summary['offered_rate_rps']:.2f}/s workers={summary['workers']} "
+        f"requests={summary['requests']} throughput={summary['throughput_rps']:.2f}/s "
+        f"p50={lat['p50']:.0f}ms p95={lat['p95']:.0f}ms p99={lat['p99']:.0f}ms "
+        f"failures={summary['failure_rate']:.1%} queue_p95={summary['queue_wait_ms_p95']:.0f}ms"
+    )
+    for kind, stats in summary["by_kind"].items():
+        print(
+            f"    {kind:<10} requests={stats['requests']:<5} failed={stats['failed']:<4} "
+            f"p50={stats['p50_ms']:.0f}ms p95={stats['p95_ms']:.0f}ms"
+        )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test /build against fake Supabase and pygbag.")
+    parser.add_argument("--rate", type=float, default=1.0, help="Arrival rate in requests per second.")
+    parser.add_argument("--rates", type=str, default=None, help="Comma-separated rates to sweep (overrides --rate).")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals per stage.")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent request handlers (gunicorn workers).")
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX, help=f"Weighted build kinds (default: {DEFAULT_MIX}).")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply every fake latency, e.g. 0.1 for quick runs.")
+    parser.add_argument("--pygbag-median-ms", type=float, default=None, help="Median fake pygbag build time.")
+    parser.add_argument("--pygbag-cpu-fraction", type=float, default=0.7, help="Share of fake pygbag time spent busy on CPU.")
+    parser.add_argument("--pygbag-fail-rate", type=float, default=0.0, help="Probability a fake pygbag build fails.")
+    parser.add_argument("--storage-fail-rate", type=float, default=0.0, help="Probability a fake Supabase call fails.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for arrivals, mix and fake latencies.")
+    parser.add_argument("--json", type=Path, default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the build service's INFO logs.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    mix = parse_mix(args.mix)
+    rates = [float(r) for r in args.rates.split(",")] if args.rates else [args.rate]
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger(build_service.__name__).setLevel(logging.CRITICAL)
+
+    demo_templates = build_service.DEMO_TEMPLATE_PATHS
+    if any(kind == "demo" for kind, _ in mix) and not any(path.exists() for path in demo_templates):
+        searched = ", ".join(str(path) for path in demo_templates)
+        print(f"Warning: no demo template at {searched}, so demo template builds will fail like they would in production")
+
+    fake = FakeSupabase(Latency(args.time_scale, args.storage_fail_rate, args.seed))
+    build_service._supabase = fake
+    rng = random.Random(args.seed)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="kyx-loadtest-") as scratch:
+        install_fake_pygbag(
+            Path(scratch),
+            time_scale=args.time_scale,
+            median_ms=args.pygbag_median_ms,
+            cpu_fraction=args.pygbag_cpu_fraction,
+            fail_rate=args.pygbag_fail_rate,
+        )
+        print(f"Load test: mix={args.mix} time_scale={args.time_scale} duration={args.duration}s per stage")
+        for rate in rates:
+            summary = run_stage(rate, args, mix, rng)
+            print_summary(summary)
+            results.append(summary)
+
+    report = {
+        "mix": args.mix,
+        "time_scale": args.time_scale,
+        "duration_s": args.duration,
+        "fake_calls": fake.calls,
+        "bytes_uploaded": fake.bytes_uploaded,
+        "stages": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
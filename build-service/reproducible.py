@@ -0,0 +1,201 @@
+"""
+Reproducible build output for the KYX Build Service.
+Normalizes a pygbag build/web directory so identical inputs produce byte-identical bundles,
+and diffs two build directories to verify it.
+
+Usage:
+    python reproducible.py normalize ./build/web
+    python reproducible.py diff ./build-a/web ./build-b/web
+"""
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import zipfile
+import argparse
+import tempfile
+from pathlib import Path
+
+# 1980-01-01 00:00:00 UTC, the earliest timestamp a zip entry can hold.
+DEFAULT_EPOCH = 315532800
+ARCHIVE_SUFFIXES = (".apk", ".zip")
+FILE_MODE = 0o644
+DIR_MODE = 0o755
+
+
+def source_date_epoch() -> int:
+    """Return the fixed timestamp for build output, honoring SOURCE_DATE_EPOCH."""
+    raw = os.getenv("SOURCE_DATE_EPOCH")
+    if raw:
+        try:
+            return max(DEFAULT_EPOCH, int(raw))
+        except ValueError:
+            pass
+    return DEFAULT_EPOCH
+
+
+def _zip_date_time(epoch: int) -> tuple:
+    return tuple(time.gmtime(epoch)[:6])
+
+
+def is_archive(path: Path) -> bool:
+    return path.suffix.lower() in ARCHIVE_SUFFIXES and zipfile.is_zipfile(path)
+
+
+def normalize_archive(path: Path, epoch: int) -> None:
+    """Rewrite a zip archive with sorted entries and fixed timestamps, modes and metadata."""
+    date_time = _zip_date_time(epoch)
+    with zipfile.ZipFile(path) as src:
+        entries = sorted(src.infolist(), key=lambda info: info.filename)
+        fd, tmp_name = tempfile.mkstemp(prefix=".normalize-", dir=path.parent)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp_name, "w") as dest:
+                for entry in entries:
+                    info = zipfile.ZipInfo(entry.filename, date_time=date_time)
+                    info.create_system = 3
+                    info.compress_type = entry.compress_type
+                    if entry.is_dir():
+                        info.external_attr = ((0o40000 | DIR_MODE) << 16) | 0x10
+                        dest.writestr(info, b"")
+                    else:
+                        info.external_attr = (0o100000 | FILE_MODE) << 16
+                        dest.writestr(info, src.read(entry))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+def normalize_bundle(build_dir: Path, epoch: int = None) -> int:
+    """
+    Make a build directory reproducible in place.
+    Archives are rewritten deterministically; every file and directory gets a fixed
+    mtime and mode. Returns the number of archives rewritten.
+    """
+    build_dir = Path(build_dir)
+    epoch = source_date_epoch() if epoch is None else epoch
+    rewritten = 0
+
+    paths = sorted(build_dir.rglob("*"))
+    for path in paths:
+        if path.is_file() and is_archive(path):
+            normalize_archive(path, epoch)
+            rewritten += 1
+
+    # Children before parents so directory mtimes are not bumped afterwards.
+    for path in reversed(paths):
+        os.chmod(path, DIR_MODE if path.is_dir() else FILE_MODE)
+        os.utime(path, (epoch, epoch))
+    os.utime(build_dir, (epoch, epoch))
+    return rewritten
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_digests(root: Path) -> dict:
+    digests = {}
+    for path in sorted(root.rglob("*")):
+        if path.is_file():
+            digests[path.relative_to(root).as_posix()] = _digest(path.read_bytes())
+    return digests
+
+
+def _archive_differences(a: Path, b: Path) -> list:
+    diffs = []
+    with zipfile.ZipFile(a) as za, zipfile.ZipFile(b) as zb:
+        names_a = [info.filename for info in za.infolist()]
+        names_b = [info.filename for info in zb.infolist()]
+        known_a = set(names_a)
+        if names_a != names_b and sorted(names_a) == sorted(names_b):
+            diffs.append("entry order differs")
+        info_b = {info.filename: info for info in zb.infolist()}
+        for info in za.infolist():
+            other = info_b.get(info.filename)
+            if other is None:
+                diffs.append(f"only in first: {info.filename}")
+                continue
+            if info.date_time != other.date_time:
+                diffs.append(f"timestamp differs: {info.filename} {info.date_time} != {other.date_time}")
+            if info.external_attr != other.external_attr:
+                diffs.append(f"mode differs: {info.filename}")
+            if not info.is_dir() and _digest(za.read(info)) != _digest(zb.read(other)):
+                diffs.append(f"content differs: {info.filename}")
+        for name in info_b:
+            if name not in known_a:
+                diffs.append(f"only in second: {name}")
+    return diffs
+
+
+def diff_builds(first: Path, second: Path) -> list:
+    """Return human-readable differences between two build directories (empty if identical)."""
+    first, second = Path(first), Path(second)
+    digests_a = _file_digests(first)
+    digests_b = _file_digests(second)
+    diffs = []
+
+    for name in sorted(set(digests_a) | set(digests_b)):
+        if name not in digests_b:
+            diffs.append(f"only in first: {name}")
+        elif name not in digests_a:
+            diffs.append(f"only in second: {name}")
+        elif digests_a[name] != digests_b[name]:
+            diffs.append(f"bytes differ: {name}")
+            path_a, path_b = first / name, second / name
+            if is_archive(path_a) and is_archive(path_b):
+                diffs.extend(f"  {detail}" for detail in _archive_differences(path_a, path_b))
+    return diffs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Normalize or compare pygbag build output.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    normalize_cmd = commands.add_parser("normalize", help="Normalize a build/web directory in place.")
+    normalize_cmd.add_argument("build_dir", type=Path)
+    normalize_cmd.add_argument("--epoch", type=int, default=None, help="Fixed mtime (default: SOURCE_DATE_EPOCH or 1980-01-01).")
+
+    diff_cmd = commands.add_parser("diff", help="Compare two build/web directories byte for byte.")
+    diff_cmd.add_argument("first", type=Path)
+    diff_cmd.add_argument("second", type=Path)
+    diff_cmd.add_argument(
+        "--normalize",
+        action="store_true",
+        help="Normalize copies of both builds first to see what normalization leaves behind.",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "normalize":
+        rewritten = normalize_bundle(args.build_dir, args.epoch)
+        print(f"Normalized {args.build_dir} ({rewritten} archives rewritten)")
+        return 0
+
+    first, second = args.first, args.second
+    scratch = None
+    if args.normalize:
+        scratch = Path(tempfile.mkdtemp(prefix="kyx-diff-"))
+        first = Path(shutil.copytree(args.first, scratch / "first"))
+        second = Path(shutil.copytree(args.second, scratch / "second"))
+        normalize_bundle(first)
+        normalize_bundle(second)
+    try:
+        diffs = diff_builds(first, second)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    if diffs:
+        print("\n".join(diffs))
+        print(f"Builds differ ({len(diffs)} differences)")
+        return 1
+    print("Builds are byte-identical")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Pooled Supabase client for the KYX Build Service.
+Storage and PostgREST calls share one keep-alive HTTP transport (HTTP/2 when `h2` is installed)
+instead of the per-client defaults the SDK creates.
+
+The pooled classes override private SDK methods (`create_session`, `_create_session`,
+`_init_storage_client`, `_init_postgrest_client`), so requirements.txt pins supabase, postgrest
+and storage3 exactly; recheck these overrides before bumping any of them.
+
+Importing this module pulls in the Supabase SDK, which is slow; app.py imports it lazily.
+"""
+
+import os
+import logging
+import importlib.util
+from typing import Dict, Optional, Tuple, Union
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSession
+from storage3 import SyncStorageClient
+from storage3.utils import SyncClient as StorageSession
+from supabase import Client, ClientOptions
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# Pool tuning (override with environment variables)
+POOL_MAX_CONNECTIONS = _env_int("SUPABASE_POOL_MAX_CONNECTIONS", 20)
+POOL_MAX_KEEPALIVE = _env_int("SUPABASE_POOL_MAX_KEEPALIVE", 10)
+POOL_KEEPALIVE_EXPIRY = _env_float("SUPABASE_POOL_KEEPALIVE_EXPIRY", 120.0)
+HTTP_CONNECT_RETRIES = _env_int("SUPABASE_HTTP_RETRIES", 2)
+HTTP2_ENABLED = os.getenv("SUPABASE_HTTP2", "1").lower() not in ("0", "false", "no")
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it."""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def build_transport(verify: bool = True, proxy: Optional[str] = None) -> httpx.HTTPTransport:
+    """Create the keep-alive transport shared by every Supabase sub-client."""
+    limits = httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+    return httpx.HTTPTransport(
+        http2=http2_available(),
+        limits=limits,
+        retries=HTTP_CONNECT_RETRIES,
+        verify=verify,
+        proxy=proxy,
+    )
+
+
+# One pool per (verify, proxy) pair, so sub-clients keep the TLS and proxy settings they were given
+_shared_transports: Dict[Tuple[bool, Optional[str]], httpx.HTTPTransport] = {}
+
+
+def shared_transport(verify: bool = True, proxy: Optional[str] = None) -> httpx.HTTPTransport:
+    key = (verify, proxy)
+    if key not in _shared_transports:
+        _shared_transports[key] = build_transport(verify, proxy)
+    return _shared_transports[key]
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session runs on the shared transport."""
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: dict,
+        timeout: Union[int, float, httpx.Timeout],
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> PostgrestSession:
+        return PostgrestSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            transport=shared_transport(verify, proxy),
+        )
+
+
+class PooledStorageClient(SyncStorageClient):
+    """Storage client whose session runs on the shared transport."""
+
+    def _create_session(
+        self,
+        base_url: str,
+        headers: dict,
+        timeout: int,
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> StorageSession:
+        return StorageSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            transport=shared_transport(verify, proxy),
+        )
+
+
+class PooledClient(Client):
+    """Supabase client that builds its storage and PostgREST clients on the shared pool."""
+
+    @staticmethod
+    def _init_storage_client(storage_url, headers, storage_client_timeout, verify=True, proxy=None):
+        return PooledStorageClient(storage_url, headers, storage_client_timeout, verify, proxy)
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout, verify=True, proxy=None):
+        return PooledPostgrestClient(
+            rest_url, headers=headers, schema=schema, timeout=timeout, verify=verify, proxy=proxy
+        )
+
+
+def create_pooled_client(supabase_url: str, supabase_key: str, options: ClientOptions = None) -> Client:
+    """Create a Supabase client backed by the shared keep-alive pool."""
+    client = PooledClient.create(supabase_url, supabase_key, options)
+    logger.info(
+        f"Supabase HTTP pool: http2={http2_available()}, max_connections={POOL_MAX_CONNECTIONS}, "
+        f"keepalive={POOL_MAX_KEEPALIVE}, keepalive_expiry={POOL_KEEPALIVE_EXPIRY}s, retries={HTTP_CONNECT_RETRIES}"
+    )
+    return client
+
+
+def warm_connection(client: Client) -> None:
+    """Open a pooled connection ahead of the first build so TLS setup is off the request path."""
+    try:
+        client.postgrest.session.head("/")
+    except httpx.HTTPError as e:
+        logger.warning(f"Supabase connection warm-up failed: {e}")
@@ -4,15 +4,50 @@ Web-compatible with pygbag
 """
 
 import asyncio
+import hashlib
+import importlib
 import json
 import math
+import os
 import random
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict, deque
+from operator import itemgetter
 from pathlib import Path
 
+# (label, perf_counter) marks from module import to the first presented frame
+STARTUP_MARKS = [("start", time.perf_counter())]
+
+
+def startup_mark(label):
+    STARTUP_MARKS.append((label, time.perf_counter()))
+
+
+def startup_report():
+    """Milliseconds spent in each startup phase, in order, plus the total."""
+    phases = {}
+    for (_, before), (label, after) in zip(STARTUP_MARKS, STARTUP_MARKS[1:]):
+        phases[label] = (after - before) * 1000
+    phases["total"] = (STARTUP_MARKS[-1][1] - STARTUP_MARKS[0][1]) * 1000
+    return phases
+
+
+# Headless runs must pick the dummy drivers before pygame opens a window
+if "--headless" in sys.argv[1:]:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
 import pygame
 
-# Initialize Pygame
-pygame.init()
+startup_mark("import pygame")
+# Only what the game uses: pygame.init() would also bring up audio, joystick and the rest
+pygame.display.init()
+pygame.font.init()
+startup_mark("pygame init")
 
 CONFIG_PATH = Path(__file__).with_name("game_config.json")
 
@@ -69,14 +104,23 @@ def load_game_config():
                 data = json.load(config_file)
         except json.JSONDecodeError:
             data = {}
-    merged = json.loads(json.dumps(DEFAULT_CONFIG))
-    return deep_merge(merged, data)
+    return deep_merge(copy_config(DEFAULT_CONFIG), data)
+
+
+def copy_config(value):
+    """Copy the dicts and lists of a JSON-style value; strings and numbers are shared."""
+    if isinstance(value, dict):
+        return {key: copy_config(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_config(item) for item in value]
+    return value
 
 
 GAME_CONFIG = load_game_config()
 STORY_CONFIG = GAME_CONFIG["story"]
 TUNING_CONFIG = GAME_CONFIG["tuning"]
 COLOR_CONFIG = GAME_CONFIG.get("colors", {})
+startup_mark("config")
 
 
 def parse_hex_color(value: str):
@@ -100,19 +144,16 @@ def color_from_config(key: str, fallback):
     return fallback
 
 
-def load_rooms_from_config():
-    """Load rooms from config or return default rooms. Defined later after Platform/Room classes."""
-    return None  # Placeholder, actual implementation below after class definitions
-
-
-def load_enemies_from_config(rooms):
-    """Load enemies from config or create default enemies. Defined later after Enemy class."""
-    return None  # Placeholder, actual implementation below after class definitions
-
 # Constants
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
-FPS = 60
+FPS = max(1, int(TUNING_CONFIG.get("displayFps", 60)))
+# Simulation ticks per second, independent of the display rate. Fixed because velocities,
+# accelerations and timers are all counted per tick and tuned for 60.
+SIM_RATE = 60
+SIM_STEP = 1.0 / SIM_RATE
+# Most ticks one rendered frame may catch up; a longer stall is dropped instead of replayed
+MAX_SIM_STEPS = max(1, int(TUNING_CONFIG.get("maxCatchUpSteps", 5)))
 PLAYER_MAX_HEALTH = max(1, int(TUNING_CONFIG.get("playerMaxHealth", 3)))
 RUN_MULTIPLIER = float(TUNING_CONFIG.get("runMultiplier", 1.45))
 DASH_SPEED = float(TUNING_CONFIG.get("dashSpeed", 14))
@@ -121,6 +162,14 @@ DASH_COOLDOWN = 48
 DASH_GRAVITY_SCALE = 0.25
 RUN_DUST_COOLDOWN = 5
 ENEMY_BASE_SPEED = float(TUNING_CONFIG.get("enemyBaseSpeed", 1.2))
+ENEMY_CHASE_MULTIPLIER = 1.8
+ENEMY_GRAVITY = 0.7
+ENEMY_JUMP_POWER = -11
+# Rooms next to the player's are caught up every this many ticks; farther rooms only when
+# they come into range. 0 freezes every room the player is not in.
+ADJACENT_ROOM_TICK_INTERVAL = max(0, int(TUNING_CONFIG.get("adjacentRoomTickInterval", 4)))
+# Rooms are prefetched only on frames that used less than this share of their time budget
+ROOM_PREFETCH_IDLE_SHARE = 0.5
 
 # Colors tuned toward a Hollow Knight inspired palette
 WHITE = (245, 246, 255)
@@ -145,18 +194,192 @@ GLOW_COLOR = (120, 205, 255, 90)
 # Ground level
 GROUND_LEVEL = WINDOW_HEIGHT - 50
 
+# Broadphase cell size for platform collision queries
+PLATFORM_GRID_CELL = 128
+
+# Rooms with more platforms than this get no navigation graph; enemies chase by heuristics there
+NAV_MAX_PLATFORMS = max(0, int(TUNING_CONFIG.get("navMaxPlatforms", 64)))
+# How close (px) an enemy must be to a route's takeoff point before it jumps
+NAV_TAKEOFF_TOLERANCE = 8
+
+# Tilemap rooms: a room's "tiles" rows mark solid tiles with TILE_SOLID; anything else is empty
+TILE_SOLID = "#"
+TILE_SIZE = max(8, int(TUNING_CONFIG.get("tileSize", 32)))
+# Tiles are pre-rendered into square chunk surfaces this many tiles on a side
+TILE_CHUNK_TILES = 8
+# Upper bound on chunk surfaces a tilemap room keeps
+TILE_CHUNK_CACHE_SIZE = 48
+# Share of the remaining distance the camera closes on the player each tick
+CAMERA_FOLLOW_RATE = 0.2
+# In rooms wider than the screen, enemies farther than this (px) outside the view sleep
+CAMERA_ACTIVE_MARGIN = max(0, int(TUNING_CONFIG.get("cameraActiveMargin", 320)))
+# Entities this far (px) past the view's edges are still drawn, for glows that overhang
+DRAW_CULL_MARGIN = 64
+
+# Upper bound on pre-rendered sprites kept by the render cache
+SPRITE_CACHE_SIZE = 512
+
+
+class SpriteCache:
+    """Bounded LRU of pre-rendered sprites keyed by the parameters they were drawn with."""
+
+    def __init__(self, max_entries=SPRITE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render, *args):
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = render(*args)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+
+
+SPRITE_CACHE = SpriteCache()
+
+# Uploaded sprites packed by the build pipeline (build-service/atlas.py)
+SPRITE_ATLAS_PATH = Path(__file__).with_name("sprites.json")
+SPRITE_ATLAS_VERSION = 1
+
+
+class SpriteAtlas:
+    """
+    Uploaded sprites served as subsurfaces of a few atlas pages. Each page is loaded and
+    converted once; get() returns None for sprites the atlas lacks, and callers draw those
+    entities procedurally.
+    """
+
+    def __init__(self, path=SPRITE_ATLAS_PATH):
+        self.path = path
+        self.index = None
+        self.pages = []
+        self.sprites = {}
+
+    def load(self):
+        if self.index is not None:
+            return
+        self.index = {}
+        try:
+            index = json.loads(self.path.read_text(encoding="utf-8"))
+        except OSError:
+            return
+        except ValueError:
+            print(f"Warning: {self.path.name} is damaged; drawing sprites procedurally", file=sys.stderr)
+            return
+        if not isinstance(index, dict) or index.get("version") != SPRITE_ATLAS_VERSION:
+            print(f"Warning: {self.path.name} is not a version {SPRITE_ATLAS_VERSION} atlas; drawing sprites procedurally", file=sys.stderr)
+            return
+        sprites = index.get("sprites", {})
+        if not isinstance(sprites, dict) or not all(
+            isinstance(entry, list) and len(entry) == 5 and all(type(v) is int for v in entry)
+            for entry in sprites.values()
+        ):
+            print(f"Warning: {self.path.name} is damaged; drawing sprites procedurally", file=sys.stderr)
+            return
+        try:
+            pages = [pygame.image.load(str(self.path.with_name(name))) for name in index["pages"]]
+        except (KeyError, TypeError, ValueError, OSError, pygame.error) as e:
+            print(f"Warning: could not load the sprite atlas ({e}); drawing sprites procedurally", file=sys.stderr)
+            return
+        if pygame.display.get_surface() is not None:
+            pages = [page.convert_alpha() for page in pages]
+        self.pages = pages
+        self.index = sprites
+
+    def get(self, name, flip=False):
+        key = (name, flip)
+        surface = self.sprites.get(key)
+        if surface is None and key not in self.sprites:
+            self.load()
+            entry = self.index.get(name)
+            if flip:
+                base = self.get(name)
+                surface = None if base is None else pygame.transform.flip(base, True, False)
+            elif entry is not None:
+                try:
+                    page, x, y, width, height = entry
+                    surface = self.pages[page].subsurface((x, y, width, height))
+                except (IndexError, TypeError, ValueError, pygame.error):
+                    surface = None
+            self.sprites[key] = surface
+        return surface
+
+
+SPRITE_ATLAS = SpriteAtlas()
+
+
+def render_platform_sprite(width, height, color):
+    surface = pygame.Surface((width, height + 6), pygame.SRCALPHA)
+    pygame.draw.rect(surface, color, (0, 0, width, height))
+    pygame.draw.rect(surface, PLATFORM_EDGE, (0, height - 6, width, 6))
+    pygame.draw.line(surface, ACCENT_CYAN, (4, 4), (width - 4, 2), 1)
+    return surface
+
+
+def render_tile_sprite(size, capped):
+    """One solid tile; `capped` tiles have open space above and get the platform highlight."""
+    surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    surface.fill(PLATFORM_BASE)
+    pygame.draw.rect(surface, PLATFORM_EDGE, (0, 0, size, size), 1)
+    if capped:
+        pygame.draw.rect(surface, PLATFORM_EDGE, (0, 0, size, 4))
+        pygame.draw.line(surface, ACCENT_CYAN, (2, 5), (size - 3, 5), 1)
+    return surface
+
+
+def render_firefly_glow():
+    glow = pygame.Surface((16, 16), pygame.SRCALPHA)
+    pygame.draw.circle(glow, GLOW_COLOR, (8, 8), 6)
+    return glow
+
+
+def render_dust_sprite(radius, alpha):
+    surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+    pygame.draw.circle(
+        surface,
+        (GROUND_LIGHT[0], GROUND_LIGHT[1], GROUND_LIGHT[2], alpha),
+        (radius, radius),
+        radius,
+    )
+    return surface
+
+
+def render_enemy_glow(width, height):
+    glow_surface = pygame.Surface((width * 2, height * 2), pygame.SRCALPHA)
+    pygame.draw.circle(glow_surface, (80, 160, 255, 70), (width, height), width)
+    return glow_surface
+
+
+def render_player_shadow(width):
+    shadow_surface = pygame.Surface((int(width * 1.8), 16), pygame.SRCALPHA)
+    pygame.draw.ellipse(shadow_surface, (10, 10, 20, 90), (0, 0, shadow_surface.get_width(), 12))
+    return shadow_surface
+
 
 def build_vertical_gradient(width, height, top_color, bottom_color):
-    surface = pygame.Surface((width, height))
+    """Rows blend top to bottom; one 1-pixel column is computed and scaled out to `width`."""
+    span = max(1, height - 1)
+    column = bytearray()
     for y in range(height):
-        t = y / (height - 1)
-        color = (
+        t = y / span
+        column += bytes((
             int(top_color[0] * (1 - t) + bottom_color[0] * t),
             int(top_color[1] * (1 - t) + bottom_color[1] * t),
             int(top_color[2] * (1 - t) + bottom_color[2] * t),
-        )
-        pygame.draw.line(surface, color, (0, y), (width, y))
-    return surface
+        ))
+    strip = pygame.image.frombuffer(bytes(column), (1, height), "RGB")
+    return pygame.transform.scale(strip, (width, height))
 
 
 BACKGROUND_LAYERS = [
@@ -166,143 +389,978 @@ BACKGROUND_LAYERS = [
 ]
 
 
-def draw_parallax_layers(screen, timer, room_index):
-    for idx, layer in enumerate(BACKGROUND_LAYERS):
-        offset = (timer * 30 * layer["parallax"] + room_index * 60) % 200
-        base_y = GROUND_LEVEL - layer["height"]
-        for x in range(-200, WINDOW_WIDTH + 200, 160):
-            peak_offset = math.sin((timer * 0.3) + (x * 0.02)) * (12 + idx * 6)
-            pts = [
-                (x + offset, GROUND_LEVEL),
-                (x + 80 + offset, base_y - peak_offset),
-                (x + 160 + offset, GROUND_LEVEL),
-            ]
-            pygame.draw.polygon(screen, layer["color"], pts)
+RIDGE_XS = tuple(range(-200, WINDOW_WIDTH + 200, 160))
+# sin/cos of each ridge's phase, so a frame needs one sin and one cos instead of one sin per ridge
+RIDGE_PHASES = tuple((math.sin(x * 0.02), math.cos(x * 0.02)) for x in RIDGE_XS)
+# Ridge sprites: 3 layers x up to 49 peak heights x 2 truncation variants per edge
+RIDGE_CACHE_SIZE = 1024
+# The mist alpha only takes values 16..40 and drifts slowly; a few filled levels cover it
+MIST_CACHE_LEVELS = 4
 
 
-def draw_mist_overlay(screen, timer):
+def render_ridge_sprite(color, apex_dx, right_dx, height):
+    """One parallax ridge, drawn exactly as pygame.draw.polygon rasterizes it on screen."""
+    surface = pygame.Surface((right_dx + 1, height + 1), pygame.SRCALPHA)
+    pygame.draw.polygon(surface, color, [(0, height), (apex_dx, 0), (right_dx, height)])
+    # Opaque-or-clear pixels: RLE makes the blit a span copy and drops the raw pixel buffer
+    surface.set_alpha(255, pygame.RLEACCEL)
+    return surface
+
+
+def render_mist_level(alpha):
     mist = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-    alpha = 28 + int(12 * math.sin(timer * 0.5))
     mist.fill((MIST_BLUE[0], MIST_BLUE[1], MIST_BLUE[2], alpha))
-    screen.blit(mist, (0, 0))
+    return mist
+
+
+class BackgroundCompositor:
+    """Gradient, parallax ridges and mist drawn from pre-rendered pieces."""
+
+    def __init__(self, gradient):
+        if pygame.display.get_surface() is not None:
+            gradient = gradient.convert()
+        self.gradient = gradient
+        self.ridges = SpriteCache(RIDGE_CACHE_SIZE)
+        self.mist_levels = SpriteCache(MIST_CACHE_LEVELS)
+
+    def draw_background(self, screen, timer, room_index):
+        screen.blit(self.gradient, (0, 0))
+        self.draw_parallax_layers(screen, timer, room_index)
+
+    def draw_parallax_layers(self, screen, timer, room_index):
+        sin_t = math.sin(timer * 0.3)
+        cos_t = math.cos(timer * 0.3)
+        ridges = self.ridges
+        for idx, layer in enumerate(BACKGROUND_LAYERS):
+            offset = (timer * 30 * layer["parallax"] + room_index * 60) % 200
+            base_y = GROUND_LEVEL - layer["height"]
+            amplitude = 12 + idx * 6
+            color = layer["color"]
+            for x, (sin_x, cos_x) in zip(RIDGE_XS, RIDGE_PHASES):
+                # sin(timer * 0.3 + x * 0.02) by the angle-sum identity
+                peak_offset = (sin_t * cos_x + cos_t * sin_x) * amplitude
+                # pygame truncates polygon points to ints; match that so sprites land on the same pixels
+                left = int(x + offset)
+                apex_dx = int(x + 80 + offset) - left
+                right_dx = int(x + 160 + offset) - left
+                apex_y = int(base_y - peak_offset)
+                if left < 0 or left + right_dx >= WINDOW_WIDTH:
+                    # pygame's clipping adds edge pixels a pre-rendered sprite would not, so
+                    # ridges crossing the screen edge are still drawn directly
+                    pygame.draw.polygon(
+                        screen,
+                        color,
+                        [(left, GROUND_LEVEL), (left + apex_dx, apex_y), (left + right_dx, GROUND_LEVEL)],
+                    )
+                    continue
+                height = GROUND_LEVEL - apex_y
+                sprite = ridges.get(
+                    (idx, apex_dx, right_dx, height),
+                    render_ridge_sprite,
+                    color,
+                    apex_dx,
+                    right_dx,
+                    height,
+                )
+                screen.blit(sprite, (left, apex_y))
+
+    def draw_mist(self, screen, timer):
+        alpha = 28 + int(12 * math.sin(timer * 0.5))
+        screen.blit(self.mist_levels.get(alpha, render_mist_level, alpha), (0, 0))
 
 
 def build_ground_surface():
-    ground_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT - GROUND_LEVEL))
-    for y in range(ground_surface.get_height()):
-        t = y / max(1, ground_surface.get_height() - 1)
-        color = (
-            int(GROUND_SHADOW[0] * (1 - t) + GROUND_LIGHT[0] * t),
-            int(GROUND_SHADOW[1] * (1 - t) + GROUND_LIGHT[1] * t),
-            int(GROUND_SHADOW[2] * (1 - t) + GROUND_LIGHT[2] * t),
-        )
-        pygame.draw.line(ground_surface, color, (0, y), (WINDOW_WIDTH, y))
-    return ground_surface
+    return build_vertical_gradient(WINDOW_WIDTH, WINDOW_HEIGHT - GROUND_LEVEL, GROUND_SHADOW, GROUND_LIGHT)
 
 
-GROUND_SURFACE = build_ground_surface()
+_ground_surface = None
+
+
+def ground_surface():
+    """The ground gradient, built the first time a room is drawn rather than at import."""
+    global _ground_surface
+    if _ground_surface is None:
+        _ground_surface = build_ground_surface()
+    return _ground_surface
 
 
 def draw_ground(screen):
-    screen.blit(GROUND_SURFACE, (0, GROUND_LEVEL))
+    screen.blit(ground_surface(), (0, GROUND_LEVEL))
     pygame.draw.line(screen, PLATFORM_EDGE, (0, GROUND_LEVEL), (WINDOW_WIDTH, GROUND_LEVEL), 2)
 
 
-def draw_ui(screen, font, player, current_room, total_rooms):
-    hud_color = ACCENT_CYAN
-    lead_name = STORY_CONFIG.get("leadName", "Lead")
-    codename = STORY_CONFIG.get("codename", "Codename")
-    rival = STORY_CONFIG.get("rivalName", "Rival")
-    goal = STORY_CONFIG.get("goal", "Reach the exit.")
-    instructions = [
-        STORY_CONFIG.get("title", "JG Engine Demo"),
-        "WASD / Arrows: move",
-        "Space: jump | Shift: sprint | Ctrl / J: dash",
-        f"Lead: {lead_name} (\"{codename}\")",
-        f"Rival: {rival}",
-        f"Goal: {goal}",
-        f"Room {current_room + 1}/{total_rooms}",
-    ]
-    extra_lines = STORY_CONFIG.get("instructions") or []
-    instructions.extend(extra_lines[:3])
-    for i, text in enumerate(instructions):
-        text_surface = font.render(text, True, hud_color)
-        screen.blit(text_surface, (12, 12 + i * 26))
-
-    for i in range(player.max_health):
-        orb_color = PALE_GLOW if i < player.health else (80, 90, 110)
-        center = (WINDOW_WIDTH - 30 - i * 26, 32)
-        pygame.draw.circle(screen, orb_color, center, 10)
-        pygame.draw.circle(screen, PLAYER_OUTLINE, center, 10, 2)
-
-
-class Firefly:
-    def __init__(self):
-        self.reset()
-
-    def reset(self):
-        self.x = random.uniform(0, WINDOW_WIDTH)
-        self.y = random.uniform(60, GROUND_LEVEL - 60)
-        self.speed = random.uniform(10, 24)
-        self.phase = random.uniform(0, 2 * math.pi)
-        self.radius = random.uniform(2, 4)
+HUD_LEFT = 12
+HUD_TOP = 12
+HUD_LINE_HEIGHT = 26
+HUD_ROOM_LINE = 6  # index of the "Room x/y" line among the HUD lines
+ORB_SPACING = 26
+ORB_RADIUS = 10
+
+
+class HUD:
+    """Story text rendered once; the room counter and health orbs re-render only when they change."""
+
+    def __init__(self, font, font_large):
+        self.font = font
+        self.font_large = font_large
+        self.color = ACCENT_CYAN
+        lead_name = STORY_CONFIG.get("leadName", "Lead")
+        codename = STORY_CONFIG.get("codename", "Codename")
+        rival = STORY_CONFIG.get("rivalName", "Rival")
+        goal = STORY_CONFIG.get("goal", "Reach the exit.")
+        self.before_room = [
+            STORY_CONFIG.get("title", "JG Engine Demo"),
+            "WASD / Arrows: move",
+            "Space: jump | Shift: sprint | Ctrl / J: dash",
+            f"Lead: {lead_name} (\"{codename}\")",
+            f"Rival: {rival}",
+            f"Goal: {goal}",
+        ]
+        extra_lines = STORY_CONFIG.get("instructions") or []
+        self.after_room = list(extra_lines[:3])
+        self.static_layer = self._render_static_layer()
+        self.room_key = None
+        self.room_surface = None
+        self.orbs_key = None
+        self.orbs_surface = None
+        self.orbs_origin = (0, 0)
+        self.game_over_layer = None
+
+    def _render_static_layer(self):
+        lines = [(i, text) for i, text in enumerate(self.before_room)]
+        lines += [(HUD_ROOM_LINE + 1 + i, text) for i, text in enumerate(self.after_room)]
+        rendered = [(i, self.font.render(text, True, self.color)) for i, text in lines]
+        width = max(surface.get_width() for _, surface in rendered)
+        height = max(i * HUD_LINE_HEIGHT + surface.get_height() for i, surface in rendered)
+        layer = pygame.Surface((width, height), pygame.SRCALPHA)
+        # Lines never overlap, so each text pixel lands on clear layer pixels and copies through unchanged
+        for i, surface in rendered:
+            layer.blit(surface, (0, i * HUD_LINE_HEIGHT))
+        return layer
+
+    def _render_orbs(self, health, max_health):
+        margin = ORB_RADIUS + 2
+        left = WINDOW_WIDTH - 30 - (max_health - 1) * ORB_SPACING - margin
+        top = 32 - margin
+        surface = pygame.Surface(((max_health - 1) * ORB_SPACING + 2 * margin + 1, 2 * margin + 1), pygame.SRCALPHA)
+        for i in range(max_health):
+            orb_color = PALE_GLOW if i < health else (80, 90, 110)
+            center = (WINDOW_WIDTH - 30 - i * ORB_SPACING - left, 32 - top)
+            pygame.draw.circle(surface, orb_color, center, ORB_RADIUS)
+            pygame.draw.circle(surface, PLAYER_OUTLINE, center, ORB_RADIUS, 2)
+        return surface, (left, top)
+
+    def draw(self, screen, player, current_room, total_rooms):
+        screen.blit(self.static_layer, (HUD_LEFT, HUD_TOP))
+
+        room_key = (current_room, total_rooms)
+        if room_key != self.room_key:
+            self.room_key = room_key
+            self.room_surface = self.font.render(f"Room {current_room + 1}/{total_rooms}", True, self.color)
+        screen.blit(self.room_surface, (HUD_LEFT, HUD_TOP + HUD_ROOM_LINE * HUD_LINE_HEIGHT))
+
+        orbs_key = (player.health, player.max_health)
+        if orbs_key != self.orbs_key:
+            self.orbs_key = orbs_key
+            self.orbs_surface, self.orbs_origin = self._render_orbs(player.health, player.max_health)
+        screen.blit(self.orbs_surface, self.orbs_origin)
+
+    def _render_game_over_layer(self):
+        layer = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        layer.fill((0, 0, 0, 160))
+        title = self.font_large.render(STORY_CONFIG.get("gameOverTitle", "Shade Dispersed"), True, PALE_GLOW)
+        hint = self.font.render(STORY_CONFIG.get("gameOverMessage", "The abyss reclaims your light..."), True, PALE_GLOW)
+        return (
+            layer,
+            title,
+            ((WINDOW_WIDTH - title.get_width()) / 2, (WINDOW_HEIGHT - title.get_height()) / 2 - 20),
+            hint,
+            ((WINDOW_WIDTH - hint.get_width()) / 2, (WINDOW_HEIGHT - hint.get_height()) / 2 + 30),
+        )
 
-    def update(self, dt):
-        self.phase += dt * 1.5
-        self.x += math.cos(self.phase) * self.speed * dt
-        self.y += math.sin(self.phase * 0.8) * self.speed * 0.2 * dt
-        if self.x < -20 or self.x > WINDOW_WIDTH + 20:
-            self.reset()
+    def draw_game_over(self, screen):
+        if self.game_over_layer is None:
+            self.game_over_layer = self._render_game_over_layer()
+        overlay, title, title_pos, hint, hint_pos = self.game_over_layer
+        screen.blit(overlay, (0, 0))
+        screen.blit(title, title_pos)
+        screen.blit(hint, hint_pos)
+
+
+# Frame profiler: toggled with F3 or `"profiler": true` under tuning
+PROFILER_ENABLED = bool(TUNING_CONFIG.get("profiler", False))
+PROFILER_TOGGLE_KEY = pygame.K_F3
+PROFILE_WINDOW = 240  # frames kept for the rolling percentiles
+PROFILE_OVERLAY_REFRESH = 30  # frames between overlay text re-renders
+PROFILE_PHASES = ("input", "player", "enemies", "particles", "background", "room", "sprites", "hud", "overlay", "flip")
+PROFILE_COUNTED_TYPES = ("Surface", "Rect")
+
+
+class CountingType(type):
+    """
+    Metaclass of the profiler's counting subclasses. Instance and subclass checks against a
+    counting class answer for the pygame type it counts, so objects pygame creates itself
+    still pass `isinstance(x, pygame.Rect)` while the profiler is on.
+    """
+
+    def __instancecheck__(cls, obj):
+        base = cls.__dict__.get("counted_base")
+        return isinstance(obj, base) if base is not None else super().__instancecheck__(obj)
+
+    def __subclasscheck__(cls, subclass):
+        base = cls.__dict__.get("counted_base")
+        return issubclass(subclass, base) if base is not None else super().__subclasscheck__(subclass)
+
+
+def counting_subclass(base, counts, name):
+    """A subclass of `base` that adds one to counts[name] per construction."""
+
+    def __init__(self, *args, **kwargs):
+        counts[name] += 1
+        base.__init__(self, *args, **kwargs)
+
+    return CountingType(f"Counted{name}", (base,), {"__init__": __init__, "counted_base": base})
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    """
+    Per-phase frame timings and Surface/Rect construction counts.
+
+    Each `lap(phase)` charges the time since the previous lap to `phase`, so a phase may be
+    charged several times in one frame. While active, pygame.Surface and pygame.Rect are
+    replaced by counting subclasses, so constructions made through the module are counted
+    and type checks keep working; objects pygame creates internally (blit results,
+    get_rect) are not counted.
+    """
+
+    def __init__(self, font=None):
+        self.font = font
+        self.active = False
+        self.frames = 0
+        self.history = {phase: deque(maxlen=PROFILE_WINDOW) for phase in PROFILE_PHASES + ("frame",)}
+        self.alloc_history = {name: deque(maxlen=PROFILE_WINDOW) for name in PROFILE_COUNTED_TYPES}
+        self.alloc_totals = dict.fromkeys(PROFILE_COUNTED_TYPES, 0)
+        self.current = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self.counts = dict.fromkeys(PROFILE_COUNTED_TYPES, 0)
+        self.originals = {}
+        self.frame_started = 0.0
+        self.last = 0.0
+        self.overlay = None
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        counts = self.counts
+        for name in PROFILE_COUNTED_TYPES:
+            original = getattr(pygame, name)
+            self.originals[name] = original
+            setattr(pygame, name, counting_subclass(original, counts, name))
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+        for name, original in self.originals.items():
+            setattr(pygame, name, original)
+        self.originals.clear()
+        self.overlay = None
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def begin_frame(self):
+        for phase in self.current:
+            self.current[phase] = 0.0
+        for name in self.counts:
+            self.counts[name] = 0
+        self.frame_started = self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        for phase, seconds in self.current.items():
+            self.history[phase].append(seconds * 1000)
+        self.history["frame"].append((self.last - self.frame_started) * 1000)
+        for name, count in self.counts.items():
+            self.alloc_history[name].append(count)
+            self.alloc_totals[name] += count
+        self.frames += 1
+
+    def phase_stats(self, phase):
+        values = sorted(self.history[phase])
+        return {
+            "p50_ms": percentile(values, 0.50),
+            "p95_ms": percentile(values, 0.95),
+            "p99_ms": percentile(values, 0.99),
+            "max_ms": values[-1] if values else 0.0,
+            "mean_ms": sum(values) / len(values) if values else 0.0,
+        }
+
+    def report(self):
+        allocations = {}
+        for name, history in self.alloc_history.items():
+            allocations[name] = {
+                "per_frame_mean": sum(history) / len(history) if history else 0.0,
+                "per_frame_max": max(history) if history else 0,
+                "total": self.alloc_totals[name],
+            }
+        return {
+            "frames": self.frames,
+            "window": PROFILE_WINDOW,
+            "frame": self.phase_stats("frame"),
+            "phases": {phase: self.phase_stats(phase) for phase in PROFILE_PHASES},
+            "allocations": allocations,
+            "sprite_cache": {"hits": SPRITE_CACHE.hits, "misses": SPRITE_CACHE.misses, "size": len(SPRITE_CACHE.entries)},
+        }
+
+    def dump(self, path=None):
+        """Write the report to `path`, or print it (the browser console under pygbag)."""
+        text = json.dumps(self.report(), indent=2)
+        if path:
+            Path(path).write_text(text + "\n", encoding="utf-8")
+            print(f"Profile written to {path}", file=sys.stderr)
+        else:
+            print(f"KYX profile:\n{text}")
+
+    def _render_overlay(self):
+        frame = self.phase_stats("frame")
+        # (label, value) rows; values get their own column since the font is proportional
+        rows = [("ms", "p50 / p95")]
+        rows.append(("frame", f"{frame['p50_ms']:.2f} / {frame['p95_ms']:.2f}"))
+        for phase in PROFILE_PHASES:
+            stats = self.phase_stats(phase)
+            rows.append((phase, f"{stats['p50_ms']:.2f} / {stats['p95_ms']:.2f}"))
+        for name in PROFILE_COUNTED_TYPES:
+            rows.append((f"{name}s", str(self.alloc_history[name][-1])))
+        rendered = [
+            (self.font.render(label, True, PALE_GLOW), self.font.render(value, True, PALE_GLOW))
+            for label, value in rows
+        ]
+        label_width = max(label.get_width() for label, _ in rendered) + 10
+        width = label_width + max(value.get_width() for _, value in rendered) + 12
+        height = len(rendered) * 16 + 8
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, (label, value) in enumerate(rendered):
+            panel.blit(label, (6, 4 + i * 16))
+            panel.blit(value, (6 + label_width, 4 + i * 16))
+        return panel
 
     def draw(self, screen):
-        glow = pygame.Surface((16, 16), pygame.SRCALPHA)
-        pygame.draw.circle(glow, GLOW_COLOR, (8, 8), 6)
-        screen.blit(glow, (self.x - 8, self.y - 8), special_flags=pygame.BLEND_ADD)
-        pygame.draw.circle(screen, PALE_GLOW, (int(self.x), int(self.y)), int(self.radius))
+        if self.font is None or not self.frames:
+            return
+        if self.overlay is None or self.frames % PROFILE_OVERLAY_REFRESH == 0:
+            self.overlay = self._render_overlay()
+        screen.blit(self.overlay, (HUD_LEFT, WINDOW_HEIGHT - self.overlay.get_height() - HUD_TOP))
+
+
+# Print how long each startup phase took once the first frame is on screen
+STARTUP_REPORT = bool(TUNING_CONFIG.get("startupReport", False))
+
+# Particle pools keep one flat buffer per field. NumPy is used when the runtime already ships it;
+# importing it by name would make pygbag bundle it into every web build, so it is looked up lazily.
+try:
+    np = importlib.import_module("numpy")
+except ImportError:
+    np = None
+
+DUST_FIELDS = ("x", "y", "vx", "vy", "life", "age", "intense")
+DUST_POOL_SIZE = max(1, int(TUNING_CONFIG.get("dustPoolSize", 512)))
+FIREFLY_FIELDS = ("x", "y", "speed", "phase", "radius")
+FIREFLY_COUNT = max(0, int(TUNING_CONFIG.get("fireflyCount", 26)))
+
+
+def allocate_buffer(capacity, use_numpy):
+    if use_numpy:
+        return np.zeros(capacity, dtype=np.float64)
+    return array("d", bytes(8 * capacity))
+
+
+class DustPool:
+    """Ground dust kept in preallocated per-field buffers, updated and culled in one pass per frame."""
 
+    def __init__(self, capacity=DUST_POOL_SIZE, use_numpy=None):
+        self.capacity = capacity
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        for field in DUST_FIELDS:
+            setattr(self, field, allocate_buffer(capacity, self.use_numpy))
+        self.count = 0
+        self.dropped = 0
 
-class GroundDustParticle:
-    def __init__(self, x, y, facing, intense=False):
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self, x, y, facing, intense=False):
+        if self.count >= self.capacity:
+            # Pool full: drop the puff rather than grow
+            self.dropped += 1
+            return False
+        i = self.count
         spread = 6 if intense else 4
-        self.x = x + random.uniform(-spread, spread)
-        self.y = y + random.uniform(-2, 2)
+        self.x[i] = x + random.uniform(-spread, spread)
+        self.y[i] = y + random.uniform(-2, 2)
         speed = 2.5 if intense else 1.5
-        self.vx = random.uniform(-0.6, 0.6) + facing * speed
-        self.vy = random.uniform(-1.2, -0.3) if intense else random.uniform(-0.6, -0.2)
-        self.life = random.randint(22, 32) if intense else random.randint(16, 24)
-        self.age = 0
-        self.intense = intense
+        self.vx[i] = random.uniform(-0.6, 0.6) + facing * speed
+        self.vy[i] = random.uniform(-1.2, -0.3) if intense else random.uniform(-0.6, -0.2)
+        self.life[i] = random.randint(22, 32) if intense else random.randint(16, 24)
+        self.age[i] = 0
+        self.intense[i] = 1 if intense else 0
+        self.count = i + 1
+        return True
 
     def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.12
-        self.age += 1
-        return self.age < self.life
+        if self.use_numpy:
+            self._update_numpy()
+        else:
+            self._update_python()
+
+    def _update_numpy(self):
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += 0.12
+        self.age[:n] += 1
+        alive = self.age[:n] < self.life[:n]
+        if alive.all():
+            return
+        keep = np.flatnonzero(alive)
+        for field in DUST_FIELDS:
+            values = getattr(self, field)
+            values[: len(keep)] = values[keep]
+        self.count = len(keep)
+
+    def _update_python(self):
+        x, y, vx, vy, life, age, intense = (getattr(self, field) for field in DUST_FIELDS)
+        # In-place compaction: survivors slide down over dead slots, so draw order stays spawn order
+        write = 0
+        for read in range(self.count):
+            x[read] += vx[read]
+            y[read] += vy[read]
+            vy[read] += 0.12
+            age[read] += 1
+            if age[read] >= life[read]:
+                continue
+            if write != read:
+                x[write] = x[read]
+                y[write] = y[read]
+                vx[write] = vx[read]
+                vy[write] = vy[read]
+                life[write] = life[read]
+                age[write] = age[read]
+                intense[write] = intense[read]
+            write += 1
+        self.count = write
+
+    def draw(self, screen, offset_x=0):
+        n = self.count
+        if n == 0:
+            return
+        if self.use_numpy:
+            alphas = np.maximum(0, (140 * (1 - self.age[:n] / self.life[:n])).astype(np.int64)).tolist()
+            xs = self.x[:n].tolist()
+            ys = self.y[:n].tolist()
+            intense = self.intense[:n].tolist()
+        else:
+            alphas = [max(0, int(140 * (1 - age / life))) for age, life in zip(self.age[:n], self.life[:n])]
+            xs, ys, intense = self.x[:n], self.y[:n], self.intense[:n]
+        blits = []
+        for x, y, alpha, is_intense in zip(xs, ys, alphas, intense):
+            radius = 5 if is_intense else 4
+            # Alpha is an int in 0..140, so at most 282 distinct dust sprites exist
+            surface = SPRITE_CACHE.get(("dust", radius, alpha), render_dust_sprite, radius, alpha)
+            blits.append((surface, (x - offset_x - radius, y - radius), None, pygame.BLEND_PREMULTIPLIED))
+        screen.blits(blits, doreturn=False)
+
+
+class FireflySwarm:
+    """Background fireflies advanced together; only the ones that drift off screen are respawned."""
+
+    def __init__(self, count=FIREFLY_COUNT, use_numpy=None):
+        self.count = count
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        for field in FIREFLY_FIELDS:
+            setattr(self, field, allocate_buffer(count, self.use_numpy))
+        for i in range(count):
+            self.reset(i)
+
+    def __len__(self):
+        return self.count
+
+    def reset(self, i):
+        self.x[i] = random.uniform(0, WINDOW_WIDTH)
+        self.y[i] = random.uniform(60, GROUND_LEVEL - 60)
+        self.speed[i] = random.uniform(10, 24)
+        self.phase[i] = random.uniform(0, 2 * math.pi)
+        self.radius[i] = random.uniform(2, 4)
+
+    def update(self, dt):
+        if self.use_numpy:
+            self.phase += dt * 1.5
+            self.x += np.cos(self.phase) * self.speed * dt
+            self.y += np.sin(self.phase * 0.8) * self.speed * 0.2 * dt
+            escaped = np.flatnonzero((self.x < -20) | (self.x > WINDOW_WIDTH + 20)).tolist()
+        else:
+            x, y, speed, phase = self.x, self.y, self.speed, self.phase
+            cos, sin = math.cos, math.sin
+            escaped = []
+            for i in range(self.count):
+                phase[i] += dt * 1.5
+                x[i] += cos(phase[i]) * speed[i] * dt
+                y[i] += sin(phase[i] * 0.8) * speed[i] * 0.2 * dt
+                if x[i] < -20 or x[i] > WINDOW_WIDTH + 20:
+                    escaped.append(i)
+        # Respawn in index order so the random stream matches one-at-a-time updates
+        for i in escaped:
+            self.reset(i)
 
     def draw(self, screen):
-        remaining = 1 - (self.age / self.life)
-        alpha = max(0, int(140 * remaining))
-        radius = 5 if self.intense else 4
-        surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-        pygame.draw.circle(
-            surface,
-            (GROUND_LIGHT[0], GROUND_LIGHT[1], GROUND_LIGHT[2], alpha),
-            (radius, radius),
-            radius,
-        )
-        screen.blit(surface, (self.x - radius, self.y - radius), special_flags=pygame.BLEND_PREMULTIPLIED)
+        glow = SPRITE_CACHE.get("firefly_glow", render_firefly_glow)
+        xs, ys, radii = self.x, self.y, self.radius
+        if self.use_numpy:
+            xs, ys, radii = xs.tolist(), ys.tolist(), radii.tolist()
+        blit, circle, add = screen.blit, pygame.draw.circle, pygame.BLEND_ADD
+        # Glow and core stay interleaved per firefly so overlapping fireflies blend as before
+        for x, y, radius in zip(xs, ys, radii):
+            blit(glow, (x - 8, y - 8), special_flags=add)
+            circle(screen, PALE_GLOW, (int(x), int(y)), int(radius))
+
+
+# Uniform-grid broadphase for a room's static platforms
+class PlatformGrid:
+    def __init__(self, platforms, cell_size=PLATFORM_GRID_CELL, width=WINDOW_WIDTH):
+        self.platforms = list(platforms)
+        self.cell_size = cell_size
+        # The room's width; entities are kept within [0, width]
+        self.width = width
+        # The room's NavGraph, when it has one
+        self.nav = None
+        # Platforms never move, so their rects are built once and reused every frame
+        self.rects = [platform.get_rect() for platform in self.platforms]
+        self.cells = {}
+        for index, rect in enumerate(self.rects):
+            for cell in self._cells_for(rect):
+                self.cells.setdefault(cell, []).append(index)
+
+    def _cells_for(self, rect):
+        size = self.cell_size
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield (cx, cy)
+
+    def candidates(self, rect, after=-1):
+        """Indices of platforms sharing a cell with rect, in room order, skipping indices <= after."""
+        found = set()
+        cells = self.cells
+        for cell in self._cells_for(rect):
+            bucket = cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return sorted(i for i in found if i > after)
+
+
+class SweepAndPrune:
+    """
+    Sort-and-sweep broadphase over a room's moving entities.
+
+    Entries persist between frames and are re-sorted by left edge each update; the order
+    barely changes frame to frame, which timsort's run detection turns into a near-linear
+    pass. The sweep only compares kinds registered as partners (by default the player
+    against enemies), so crowds of one kind do not pay for pairs nobody resolves.
+    """
+
+    def __init__(self, pair_kinds=(("player", "enemy"),)):
+        self.pair_kinds = set(pair_kinds)
+        self.partners = {}
+        for first, second in pair_kinds:
+            self.partners.setdefault(first, set()).add(second)
+            self.partners.setdefault(second, set()).add(first)
+        self.entries = []  # [left, right, top, bottom, kind, entity, stamp], sorted by left
+        self.tracked = {}
+        self.stamp = 0
+
+    def update(self, entities):
+        """Refresh bounds from `(kind, entity)` pairs; entities no longer listed are dropped."""
+        tracked = self.tracked
+        self.stamp = stamp = self.stamp + 1
+        seen = 0
+        for kind, entity in entities:
+            rect = entity.get_rect()
+            entry = tracked.get(id(entity))
+            if entry is None:
+                entry = [0, 0, 0, 0, kind, entity, stamp]
+                tracked[id(entity)] = entry
+                self.entries.append(entry)
+            entry[0] = rect.left
+            entry[1] = rect.right
+            entry[2] = rect.top
+            entry[3] = rect.bottom
+            entry[4] = kind
+            entry[6] = stamp
+            seen += 1
+        if seen != len(self.entries):
+            self.entries = [entry for entry in self.entries if entry[6] == stamp]
+            self.tracked = {id(entry[5]): entry for entry in self.entries}
+        self.entries.sort(key=itemgetter(0))
+
+    def pairs(self):
+        """Overlapping (a, b) pairs, oriented as registered in `pair_kinds`, in sweep order."""
+        found = []
+        partners = self.partners
+        active = {kind: [] for kind in partners}
+        for entry in self.entries:
+            left, right, top, bottom, kind, entity, _ = entry
+            kinds = partners.get(kind)
+            if kinds is None or left == right or top == bottom:
+                continue
+            for other_kind in kinds:
+                bucket = active[other_kind]
+                if not bucket:
+                    continue
+                # Everything in the bucket starts at or before `left`; keep what reaches past it
+                bucket[:] = [other for other in bucket if other[1] > left]
+                for other in bucket:
+                    if other[2] < bottom and top < other[3]:
+                        if (kind, other_kind) in self.pair_kinds:
+                            found.append((entity, other[5]))
+                        else:
+                            found.append((other[5], entity))
+            active[kind].append(entry)
+        return found
+
+
+class NavGraph:
+    """
+    Routes between the surfaces of one room, for enemies chasing the player.
+
+    Node 0 is the ground and node i + 1 is platform i. An enemy can walk off either end of
+    a platform onto whatever lies below, or jump to a higher surface when its jump clears
+    the height and, at chase speed, covers the gap before falling back to that height.
+    Jumps take off beside the target so the enemy does not bonk its underside. A
+    breadth-first search per destination fills next-hop tables at load, so a chasing
+    enemy's lookup is two index operations.
+    """
+
+    GROUND = 0
+
+    def __init__(
+        self,
+        platforms,
+        width=28,
+        jump_power=ENEMY_JUMP_POWER,
+        gravity=ENEMY_GRAVITY,
+        speed=ENEMY_BASE_SPEED * ENEMY_CHASE_MULTIPLIER,
+        room_width=WINDOW_WIDTH,
+    ):
+        self.platforms = list(platforms)
+        self.room_width = room_width
+        self.node_of = {id(platform): i + 1 for i, platform in enumerate(self.platforms)}
+        self.surfaces = [(0.0, float(room_width), float(GROUND_LEVEL))] + [
+            (float(p.x), float(p.x + p.width), float(p.y)) for p in self.platforms
+        ]
+        self.half_width = width / 2
+        self.edges = [[] for _ in self.surfaces]  # (node, waypoint_x, jump) per source node
+        self._link_drops()
+        self._link_jumps(-jump_power, gravity, speed)
+        self._fill_next_hops()
+        self._located = None
+
+    def surface_below(self, x, y):
+        """The highest surface whose top is below height `y` and that catches an enemy at `x`."""
+        best, best_top = self.GROUND, self.surfaces[self.GROUND][2]
+        half = self.half_width
+        for node in range(1, len(self.surfaces)):
+            left, right, top = self.surfaces[node]
+            if y < top < best_top and left - half < x < right + half:
+                best, best_top = node, top
+        return best
+
+    def locate(self, x, bottom):
+        """The node an entity with feet at `bottom` stands on or will land on."""
+        key = (x, bottom)
+        if self._located is None or self._located[0] != key:
+            self._located = (key, self.surface_below(x, bottom - 1))
+        return self._located[1]
+
+    def node_for(self, enemy):
+        """The node a grounded enemy stands on, or None while it is airborne."""
+        if not enemy.on_ground:
+            return None
+        if enemy.current_platform is None:
+            return self.GROUND
+        return self.node_of.get(id(enemy.current_platform), self.GROUND)
+
+    def next_hop(self, source, target):
+        """(waypoint_x, jump) for the first edge from `source` toward `target`, or None."""
+        if self.next_node[source][target] < 0:
+            return None
+        return self.waypoint_x[source][target], self.jump[source][target]
+
+    def _link_drops(self):
+        half = self.half_width
+        for node in range(1, len(self.surfaces)):
+            left, right, top = self.surfaces[node]
+            for drop_x in (left - half - 1, right + half + 1):
+                if half <= drop_x <= self.room_width - half:
+                    self.edges[node].append((self.surface_below(drop_x, top), drop_x, False))
+
+    def _link_jumps(self, launch_speed, gravity, speed):
+        half = self.half_width
+        max_rise = launch_speed * launch_speed / (2 * gravity)
+        for node, (left, right, top) in enumerate(self.surfaces):
+            for target in range(1, len(self.surfaces)):
+                t_left, t_right, t_top = self.surfaces[target]
+                rise = top - t_top
+                if target == node or rise <= 0 or rise > max_rise:
+                    continue
+                # Ticks until the enemy comes back down to the target's height
+                airtime = (launch_speed + math.sqrt(launch_speed * launch_speed - 2 * gravity * rise)) / gravity
+                reach = speed * airtime
+                best = None
+                for takeoff in (t_left - half - 1, t_right + half + 1):
+                    takeoff = min(max(takeoff, left, half), right, self.room_width - half)
+                    if t_left < takeoff + half and takeoff - half < t_right:
+                        continue
+                    gap = t_left - takeoff if takeoff < t_left else takeoff - t_right
+                    if gap <= reach and (best is None or gap < best[0]):
+                        best = (gap, takeoff)
+                if best is not None:
+                    self.edges[node].append((target, best[1], True))
+
+    def _fill_next_hops(self):
+        count = len(self.surfaces)
+        incoming = [[] for _ in range(count)]
+        for node, edges in enumerate(self.edges):
+            for target, _, _ in edges:
+                incoming[target].append(node)
+        self.next_node = [[-1] * count for _ in range(count)]
+        self.waypoint_x = [[0.0] * count for _ in range(count)]
+        self.jump = [[False] * count for _ in range(count)]
+        for target in range(count):
+            hops = [-1] * count
+            hops[target] = 0
+            queue = deque([target])
+            while queue:
+                node = queue.popleft()
+                for source in incoming[node]:
+                    if hops[source] < 0:
+                        hops[source] = hops[node] + 1
+                        queue.append(source)
+            for source in range(count):
+                if source == target or hops[source] < 0:
+                    continue
+                for node, waypoint_x, jump in self.edges[source]:
+                    if hops[node] == hops[source] - 1:
+                        self.next_node[source][target] = node
+                        self.waypoint_x[source][target] = waypoint_x
+                        self.jump[source][target] = jump
+                        break
+
+
+def as_platform_grid(platforms):
+    """Accept a room's grid or a plain platform list (built into a throwaway grid)."""
+    if isinstance(platforms, PlatformGrid):
+        return platforms
+    return PlatformGrid(platforms)
 
 
 # Room class
 class Room:
-    def __init__(self, platforms):
+    def __init__(self, platforms, width=WINDOW_WIDTH):
         self.platforms = platforms
+        self.width = width
+        self.grid = PlatformGrid(platforms, width=width)
+        if len(platforms) <= NAV_MAX_PLATFORMS:
+            self.grid.nav = NavGraph(platforms, room_width=width)
+        self.static_layer = None
+        self.static_layer_top = 0
     
     def draw(self, screen):
         for platform in self.platforms:
             platform.draw(screen)
 
+    def bake_static_layer(self):
+        """Render ground and platforms once into a transparent layer cropped to their extent."""
+        top = min([GROUND_LEVEL] + [int(math.floor(p.y)) for p in self.platforms])
+        top = max(0, top)
+        layer = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT - top), pygame.SRCALPHA)
+        layer.blit(ground_surface(), (0, GROUND_LEVEL - top))
+        pygame.draw.line(layer, PLATFORM_EDGE, (0, GROUND_LEVEL - top), (WINDOW_WIDTH, GROUND_LEVEL - top), 2)
+        for platform in self.platforms:
+            platform.draw(layer, offset_y=-top)
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert_alpha()
+        # Pixels are either fully opaque or fully clear, so RLE turns the blit into span copies
+        layer.set_alpha(255, pygame.RLEACCEL)
+        self.static_layer = layer
+        self.static_layer_top = top
+
+    def invalidate_static_layer(self):
+        self.static_layer = None
+
+    def draw_static(self, screen, camera_x=0):
+        """Draw ground and platforms with a single blit of the baked layer."""
+        if self.static_layer is None:
+            self.bake_static_layer()
+        screen.blit(self.static_layer, (-camera_x, self.static_layer_top))
+
+
+class TileMap:
+    """
+    The solid tiles of a scrolling room, as rows of strings.
+
+    The bottom row sits on the ground and the room is as wide as its longest row, but never
+    narrower than the screen. Rows that would start above the top of the screen are dropped.
+    """
+
+    def __init__(self, rows, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        fit = GROUND_LEVEL // tile_size
+        self.rows = tuple(rows[len(rows) - fit:]) if len(rows) > fit else tuple(rows)
+        self.columns = max((len(row) for row in self.rows), default=0)
+        self.width = max(WINDOW_WIDTH, self.columns * tile_size)
+        self.top = GROUND_LEVEL - len(self.rows) * tile_size
+
+    @classmethod
+    def from_config(cls, room_data):
+        """The TileMap of a config room with "tiles" rows, or None if it has no solid tiles."""
+        rows = room_data.get("tiles")
+        if not isinstance(rows, list) or not all(isinstance(row, str) for row in rows):
+            return None
+        tile_size = room_data.get("tileSize")
+        if not isinstance(tile_size, (int, float)) or not math.isfinite(tile_size):
+            tile_size = TILE_SIZE
+        tilemap = cls(rows, max(8, int(tile_size)))
+        return tilemap if any(TILE_SOLID in row for row in tilemap.rows) else None
+
+    def is_solid(self, row, column):
+        rows = self.rows
+        return 0 <= row < len(rows) and 0 <= column < len(rows[row]) and rows[row][column] == TILE_SOLID
+
+    def solid_rects(self):
+        """
+        Solid tiles merged into (x, y, width, height) rects, top to bottom then left to right:
+        each row's runs of solid tiles, stacked while the rows below repeat the same run.
+        Collisions then test a handful of rects rather than every tile.
+        """
+        size = self.tile_size
+        rects = []
+        growing = {}  # (first column, end column) -> rect still extending downward
+        for r, row in enumerate(self.rows):
+            runs = []
+            start = row.find(TILE_SOLID)
+            while start >= 0:
+                end = start
+                while end < len(row) and row[end] == TILE_SOLID:
+                    end += 1
+                runs.append((start, end))
+                start = row.find(TILE_SOLID, end)
+            for run in [run for run in growing if run not in runs]:
+                rects.append(growing.pop(run))
+            for start, end in runs:
+                if (start, end) in growing:
+                    growing[(start, end)][3] += size
+                else:
+                    growing[(start, end)] = [start * size, self.top + r * size, (end - start) * size, size]
+        rects.extend(growing.values())
+        return sorted((tuple(rect) for rect in rects), key=itemgetter(1, 0))
+
+
+class TileRoom(Room):
+    """
+    A room built from a TileMap, wider than the screen and drawn through the camera.
+
+    Solid tiles collide as merged rects (TileMap.solid_rects) through the usual platform
+    grid. For drawing, tiles are pre-rendered into square chunk surfaces the first time a
+    chunk comes into view, and only chunks overlapping the view are blitted, so draw cost
+    follows the screen size rather than the level size.
+    """
+
+    def __init__(self, tilemap):
+        super().__init__([Platform(*rect) for rect in tilemap.solid_rects()], width=tilemap.width)
+        self.tilemap = tilemap
+        self.chunk_size = TILE_CHUNK_TILES * tilemap.tile_size
+        self.chunks = OrderedDict()
+
+    def invalidate_static_layer(self):
+        self.chunks.clear()
+
+    def chunk(self, cx, cy):
+        """Chunk (cx, cy)'s surface, rendering it on first use; None for chunks with no tiles."""
+        chunks = self.chunks
+        if (cx, cy) in chunks:
+            chunks.move_to_end((cx, cy))
+            return chunks[(cx, cy)]
+        surface = self._render_chunk(cx, cy)
+        chunks[(cx, cy)] = surface
+        if len(chunks) > TILE_CHUNK_CACHE_SIZE:
+            chunks.popitem(last=False)
+        return surface
+
+    def _render_chunk(self, cx, cy):
+        tilemap = self.tilemap
+        size = tilemap.tile_size
+        first_row, first_column = cy * TILE_CHUNK_TILES, cx * TILE_CHUNK_TILES
+        blits = []
+        for r in range(first_row, min(first_row + TILE_CHUNK_TILES, len(tilemap.rows))):
+            row = tilemap.rows[r]
+            for c in range(first_column, min(first_column + TILE_CHUNK_TILES, len(row))):
+                if row[c] == TILE_SOLID:
+                    capped = not tilemap.is_solid(r - 1, c)
+                    sprite = SPRITE_CACHE.get(("tile", size, capped), render_tile_sprite, size, capped)
+                    blits.append((sprite, ((c - first_column) * size, (r - first_row) * size)))
+        if not blits:
+            return None
+        surface = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA)
+        surface.blits(blits, doreturn=False)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        # Tiles are opaque, so as with baked rooms RLE turns the blit into span copies
+        surface.set_alpha(255, pygame.RLEACCEL)
+        return surface
+
+    def draw_static(self, screen, camera_x=0):
+        """Draw the ground and the chunks overlapping the view [camera_x, camera_x + WINDOW_WIDTH)."""
+        draw_ground(screen)
+        tilemap = self.tilemap
+        size = self.chunk_size
+        last_column = (tilemap.columns - 1) // TILE_CHUNK_TILES
+        first = max(0, camera_x // size)
+        last = min(last_column, (camera_x + WINDOW_WIDTH - 1) // size)
+        for cy in range((len(tilemap.rows) + TILE_CHUNK_TILES - 1) // TILE_CHUNK_TILES):
+            y = tilemap.top + cy * size
+            if y >= WINDOW_HEIGHT or y + size <= 0:
+                continue
+            for cx in range(first, last + 1):
+                surface = self.chunk(cx, cy)
+                if surface is not None:
+                    screen.blit(surface, (cx * size - camera_x, y))
+
+
+def build_room(layout):
+    """A Room from a spec layout: a TileMap, or (x, y, width, height) platforms."""
+    if isinstance(layout, TileMap):
+        return TileRoom(layout)
+    return Room([Platform(*spec) for spec in layout])
+
 # Platform class
 class Platform:
     def __init__(self, x, y, width, height, color=PLATFORM_BASE):
@@ -316,18 +1374,23 @@ class Platform:
         """Return pygame Rect for collision detection"""
         return pygame.Rect(self.x, self.y, self.width, self.height)
     
-    def draw(self, screen):
-        surface = pygame.Surface((self.width, self.height + 6), pygame.SRCALPHA)
-        pygame.draw.rect(surface, self.color, (0, 0, self.width, self.height))
-        pygame.draw.rect(surface, PLATFORM_EDGE, (0, self.height - 6, self.width, 6))
-        pygame.draw.line(surface, ACCENT_CYAN, (4, 4), (self.width - 4, 2), 1)
-        screen.blit(surface, (self.x, self.y))
+    def draw(self, screen, offset_y=0):
+        surface = SPRITE_CACHE.get(
+            ("platform", self.width, self.height, self.color),
+            render_platform_sprite,
+            self.width,
+            self.height,
+            self.color,
+        )
+        screen.blit(surface, (self.x, self.y + offset_y))
 
 # Player class
 class Player:
     def __init__(self, x, y):
         self.x = x
         self.y = y
+        self.prev_x = x
+        self.prev_y = y
         self.width = 20
         self.height = 50
         self.speed = 4.5
@@ -364,8 +1427,14 @@ class Player:
             self.width,
             self.height
         )
+
+    def remember_position(self):
+        """Store the position at the start of a tick for render interpolation."""
+        self.prev_x = self.x
+        self.prev_y = self.y
     
     def update(self, keys, platforms, dust_particles=None):
+        grid = as_platform_grid(platforms)
         if self.invuln_timer > 0:
             self.invuln_timer -= 1
         if self.dash_cooldown_timer > 0:
@@ -459,9 +1528,9 @@ class Player:
 
         # Check horizontal collisions
         player_rect = self.get_rect()
-        for platform in platforms:
-            platform_rect = platform.get_rect()
-            if player_rect.colliderect(platform_rect):
+        for index in grid.candidates(player_rect):
+            platform = grid.platforms[index]
+            if player_rect.colliderect(grid.rects[index]):
                 # Resolve horizontal collision based on movement direction
                 if self.velocity_x > 0:  # Moving right, hit left side of platform
                     self.x = platform.x - self.width / 2
@@ -486,10 +1555,10 @@ class Player:
         self.on_ground = False
         player_rect = self.get_rect()
 
-        for platform in platforms:
-            platform_rect = platform.get_rect()
+        for index in grid.candidates(player_rect):
+            platform = grid.platforms[index]
 
-            if player_rect.colliderect(platform_rect):
+            if player_rect.colliderect(grid.rects[index]):
                 # Use previous position to determine collision direction
                 prev_player_bottom = prev_y + self.height / 2
                 prev_player_top = prev_y - self.height / 2
@@ -537,13 +1606,13 @@ class Player:
             self.x = WINDOW_WIDTH - self.width / 2 - 10  # Position on right side of new room
 
         # Check if player walked off right edge
-        elif self.x + self.width / 2 > WINDOW_WIDTH:
+        elif self.x + self.width / 2 > grid.width:
             room_change = 1
             self.x = self.width / 2 + 10  # Position on left side of new room
 
         # Keep player within canvas bounds (horizontal) - only if not transitioning
         if room_change == 0:
-            self.x = max(self.width / 2, min(WINDOW_WIDTH - self.width / 2, self.x))
+            self.x = max(self.width / 2, min(grid.width - self.width / 2, self.x))
 
         # Prevent player from going above canvas
         if self.y - self.height / 2 < 0:
@@ -570,17 +1639,35 @@ class Player:
     
     def draw(self, screen):
         body_color = self.base_color if self.alive else SOFT_PURPLE
-        if self.invuln_timer > 0 and (self.invuln_timer // 4) % 2 == 0:
+        blink = self.invuln_timer > 0 and (self.invuln_timer // 4) % 2 == 0
+        if blink:
             body_color = PALE_GLOW
 
         # Faint shadow
-        shadow_surface = pygame.Surface((int(self.width * 1.8), 16), pygame.SRCALPHA)
-        pygame.draw.ellipse(shadow_surface, (10, 10, 20, 90), (0, 0, shadow_surface.get_width(), 12))
+        shadow_surface = SPRITE_CACHE.get(("player_shadow", self.width), render_player_shadow, self.width)
         screen.blit(
             shadow_surface,
             (self.x - shadow_surface.get_width() / 2, self.y + self.height / 2 - 4),
         )
 
+        sprite = SPRITE_ATLAS.get("player", flip=self.facing < 0)
+        if sprite is None:
+            self._draw_figure(screen, body_color)
+        elif not blink:
+            # Stand the sprite on the player's feet; it blinks out instead of flashing while invulnerable
+            screen.blit(sprite, (self.x - sprite.get_width() / 2, self.y + self.height / 2 - sprite.get_height()))
+
+        # Wisp trail while moving through air or dashing
+        if not self.on_ground or self.is_dashing:
+            pygame.draw.line(
+                screen,
+                ACCENT_CYAN,
+                (self.x, self.y),
+                (self.x - self.velocity_x * 2, self.y - self.velocity_y * 2),
+                2,
+            )
+
+    def _draw_figure(self, screen, body_color):
         # Cloak
         cloak_points = [
             (self.x - self.width / 2 - 6, self.y + 4),
@@ -626,16 +1713,6 @@ class Player:
         pygame.draw.lines(screen, PLAYER_OUTLINE, False, horn_left, 2)
         pygame.draw.lines(screen, PLAYER_OUTLINE, False, horn_right, 2)
 
-        # Wisp trail while moving through air or dashing
-        if not self.on_ground or self.is_dashing:
-            pygame.draw.line(
-                screen,
-                ACCENT_CYAN,
-                (self.x, self.y),
-                (self.x - self.velocity_x * 2, self.y - self.velocity_y * 2),
-                2,
-            )
-
     def _maybe_emit_dust(self, dust_particles):
         if dust_particles is None or not self.on_ground:
             return
@@ -654,14 +1731,16 @@ class Player:
         facing = self.facing if self.facing != 0 else 1
         foot_y = self.y + self.height / 2 + 3
         for _ in range(count):
-            dust_particles.append(GroundDustParticle(self.x, foot_y, facing, intense=intense))
+            dust_particles.spawn(self.x, foot_y, facing, intense=intense)
 
 
 # Simple enemy class
 class Enemy:
-    def __init__(self, x, y, width=28, height=36, color=ENEMY_BODY, speed=ENEMY_BASE_SPEED):
+    def __init__(self, x, y, width=28, height=36, color=ENEMY_BODY, speed=ENEMY_BASE_SPEED, patrol_timer=None):
         self.x = x
         self.y = y
+        self.prev_x = x
+        self.prev_y = y
         self.width = width
         self.height = height
         self.color = color
@@ -669,12 +1748,12 @@ class Enemy:
         self.direction = 1
         self.velocity_x = 0
         self.velocity_y = 0
-        self.gravity = 0.7
+        self.gravity = ENEMY_GRAVITY
         self.acceleration = 0.25
         self.on_ground = False
         self.alive = True
         self.base_speed = speed
-        self.chase_speed = speed * 1.8
+        self.chase_speed = speed * ENEMY_CHASE_MULTIPLIER
         self.attack_speed = speed * 2.6
         self.attack_range = 120
         self.detection_range = 320
@@ -684,19 +1763,24 @@ class Enemy:
         self.attack_timer = 0
         self.attack_damage = 1
         self.state = "patrol"
-        self.jump_power = -11
+        self.jump_power = ENEMY_JUMP_POWER
         self.jump_cooldown = 45
         self.jump_timer = 0
         self.current_platform = None
-        self.patrol_timer = random.randint(90, 180)
+        self.patrol_timer = random.randint(90, 180) if patrol_timer is None else patrol_timer
         self.edge_padding = 12
 
     def get_rect(self):
         return pygame.Rect(self.x - self.width / 2, self.y - self.height / 2, self.width, self.height)
 
+    def remember_position(self):
+        self.prev_x = self.x
+        self.prev_y = self.y
+
     def update(self, platforms, player):
         if not self.alive:
             return
+        platforms = as_platform_grid(platforms)
 
         if self.jump_timer > 0:
             self.jump_timer -= 1
@@ -710,8 +1794,13 @@ class Enemy:
         elif self.state == "attack":
             move_speed = self.attack_speed
 
+        route = None
         if self.state in ("chase", "attack") and player.alive:
-            self._face_player(player)
+            route = self._route(platforms.nav, player)
+            if route is not None:
+                self._face_x(route[0])
+            else:
+                self._face_player(player)
         elif self.state == "patrol":
             self._handle_patrol_direction()
 
@@ -744,22 +1833,26 @@ class Enemy:
         else:
             self.current_platform = self.current_platform or self._platform_underfoot(platforms)
 
-        self._keep_in_bounds()
-        self._maybe_jump(platforms, player)
+        self._keep_in_bounds(platforms.width)
+        self._maybe_jump(platforms, player, route)
 
     def draw(self, screen):
         if not self.alive:
             return
 
-        glow_surface = pygame.Surface((self.width * 2, self.height * 2), pygame.SRCALPHA)
-        pygame.draw.circle(
-            glow_surface,
-            (80, 160, 255, 70),
-            (self.width, self.height),
+        glow_surface = SPRITE_CACHE.get(
+            ("enemy_glow", self.width, self.height),
+            render_enemy_glow,
             self.width,
+            self.height,
         )
         screen.blit(glow_surface, (self.x - self.width, self.y - self.height), special_flags=pygame.BLEND_ADD)
 
+        sprite = SPRITE_ATLAS.get("enemy", flip=self.direction < 0)
+        if sprite is not None:
+            screen.blit(sprite, (self.x - sprite.get_width() / 2, self.y + self.height / 2 + 6 - sprite.get_height()))
+            return
+
         body_rect = pygame.Rect(
             self.x - self.width / 2,
             self.y - self.height / 2,
@@ -820,14 +1913,23 @@ class Enemy:
         if self.current_platform and self._near_platform_edge(padding=self.edge_padding):
             self.direction *= -1
 
-    def _maybe_jump(self, platforms, player):
+    def _maybe_jump(self, platforms, player, route=None):
         if not self.on_ground or self.jump_timer > 0:
             return
 
         need_jump = False
 
+        if route is not None:
+            # Following a route: jump only from its takeoff point
+            waypoint_x, jump, source = route
+            need_jump = (
+                jump
+                and platforms.nav.node_for(self) == source
+                and abs(self.x - waypoint_x) <= NAV_TAKEOFF_TOLERANCE
+            )
+
         # Jump toward a higher player while chasing/attacking
-        if self.state in ("chase", "attack"):
+        elif self.state in ("chase", "attack"):
             if player.y + player.height / 2 < self.y - 10:
                 need_jump = True
 
@@ -853,16 +1955,38 @@ class Enemy:
         return self.x - self.width / 2 <= left_bound or self.x + self.width / 2 >= right_bound
 
     def _face_player(self, player):
-        dx = player.x - self.x
+        self._face_x(player.x)
+
+    def _face_x(self, x):
+        dx = x - self.x
         if abs(dx) <= 5:
             return
         self.direction = 1 if dx > 0 else -1
 
-    def _move_horizontal(self, platforms):
+    def _route(self, nav, player):
+        """(waypoint_x, jump, source node) of the next hop toward the player's surface, or None."""
+        if nav is None:
+            return None
+        source = nav.node_for(self)
+        if source is None:
+            return None
+        target = nav.locate(player.x, player.y + player.height / 2)
+        if source == target:
+            return None
+        hop = nav.next_hop(source, target)
+        if hop is None:
+            return None
+        return hop[0], hop[1], source
+
+    def _move_horizontal(self, grid):
         self.x += self.velocity_x
         rect = self.get_rect()
-        for p in platforms:
-            pr = p.get_rect()
+        candidates = grid.candidates(rect)
+        k = 0
+        while k < len(candidates):
+            index = candidates[k]
+            k += 1
+            pr = grid.rects[index]
             if rect.colliderect(pr):
                 if self.velocity_x > 0:
                     self.x = pr.x - self.width / 2
@@ -870,12 +1994,20 @@ class Enemy:
                     self.x = pr.x + pr.width + self.width / 2
                 self.velocity_x = 0
                 rect = self.get_rect()
+                # The rect moved, so later platforms may now be in different cells
+                candidates = grid.candidates(rect, after=index)
+                k = 0
 
-    def _move_vertical(self, platforms, prev_y, safe_x):
+    def _move_vertical(self, grid, prev_y, safe_x):
         self.on_ground = False
         rect = self.get_rect()
-        for p in platforms:
-            pr = p.get_rect()
+        candidates = grid.candidates(rect)
+        k = 0
+        while k < len(candidates):
+            index = candidates[k]
+            k += 1
+            p = grid.platforms[index]
+            pr = grid.rects[index]
             if rect.colliderect(pr):
                 platform_top = p.y
                 platform_bottom = p.y + p.height
@@ -887,283 +2019,1570 @@ class Enemy:
                     self.velocity_y = 0
                     self.on_ground = True
                     self.current_platform = p
-                    rect = self.get_rect()
                 elif prev_top >= platform_bottom and self.velocity_y <= 0:
                     self.y = platform_bottom + self.height / 2
                     self.velocity_y = 0
                     self.jump_timer = max(self.jump_timer, int(self.jump_cooldown * 0.6))
-                    rect = self.get_rect()
                 else:
                     # Diagonal collision: revert horizontal movement to avoid snagging
                     self.x = safe_x
                     self.velocity_x = 0
-                    rect = self.get_rect()
+                rect = self.get_rect()
+                candidates = grid.candidates(rect, after=index)
+                k = 0
 
-    def _keep_in_bounds(self):
+    def _keep_in_bounds(self, room_width=WINDOW_WIDTH):
         left_edge = self.x - self.width / 2
         right_edge = self.x + self.width / 2
         if left_edge < 0:
             self.x = self.width / 2
             self.direction = 1
             self.velocity_x = 0
-        elif right_edge > WINDOW_WIDTH:
-            self.x = WINDOW_WIDTH - self.width / 2
+        elif right_edge > room_width:
+            self.x = room_width - self.width / 2
             self.direction = -1
             self.velocity_x = 0
 
-    def _platform_underfoot(self, platforms):
-        rect = self.get_rect()
-        foot_rect = rect.move(0, 2)
-        for p in platforms:
-            if foot_rect.colliderect(p.get_rect()):
-                return p
+    def _platform_underfoot(self, grid):
+        foot_rect = self.get_rect().move(0, 2)
+        for index in grid.candidates(foot_rect):
+            if foot_rect.colliderect(grid.rects[index]):
+                return grid.platforms[index]
         return None
 
+    def _landing_platform(self, grid):
+        """The platform this enemy would land on falling straight down, or None for the ground."""
+        rect = self.get_rect()
+        feet = self.y + self.height / 2
+        best = None
+        for platform, pr in zip(grid.platforms, grid.rects):
+            if pr.left < rect.right and rect.left < pr.right and platform.y >= feet:
+                if best is None or platform.y < best.y:
+                    best = platform
+        return best
+
+    def fast_forward(self, grid, ticks):
+        """
+        Advance an enemy in a room the player is not in by `ticks` in one step.
+        With nobody to chase it only patrols: it settles on the surface below it and paces
+        that platform (or the ground) at base speed, turning at the same edges the per-tick
+        patrol does. Nothing is random, so off-screen rooms leave the random stream alone.
+        """
+        if ticks <= 0 or not self.alive:
+            return
+        half_width = self.width / 2
+        platform = self.current_platform if self.on_ground else self._landing_platform(grid)
+        if platform is not None:
+            low = platform.x + self.edge_padding + half_width
+            high = platform.x + platform.width - self.edge_padding - half_width
+            self.y = platform.y - self.height / 2
+        else:
+            low, high = half_width, grid.width - half_width
+            self.y = GROUND_LEVEL - self.height / 2
+        span = high - low
+        if span > 0:
+            offset = min(max(self.x - low, 0), span)
+            # Unfold the back-and-forth walk into one direction, advance, then fold it back
+            travelled = (offset if self.direction > 0 else 2 * span - offset) + self.base_speed * ticks
+            travelled %= 2 * span
+            if travelled <= span:
+                self.x, self.direction = low + travelled, 1
+            else:
+                self.x, self.direction = low + 2 * span - travelled, -1
+        self.state = "patrol"
+        self.on_ground = True
+        self.current_platform = platform
+        self.velocity_x = self.base_speed * self.direction
+        self.velocity_y = 0
+        self.attack_timer = 0
+        self.attack_cooldown_timer = max(0, self.attack_cooldown_timer - ticks)
+        self.jump_timer = max(0, self.jump_timer - ticks)
+        self.patrol_timer = max(1, self.patrol_timer - ticks)
+        self.prev_x, self.prev_y = self.x, self.y
+
+
+# Rooms with at least this many enemies are simulated by EnemyBatch when NumPy is available (0 disables)
+ENEMY_BATCH_THRESHOLD = int(TUNING_CONFIG.get("enemyBatchThreshold", 24))
+ENEMY_STATES = ("patrol", "chase", "attack")
+PATROL, CHASE, ATTACK = range(3)
+ENEMY_FLOAT_FIELDS = (
+    "x", "y", "prev_x", "prev_y", "width", "height", "velocity_x", "velocity_y", "gravity",
+    "acceleration", "base_speed", "chase_speed", "attack_speed", "attack_range",
+    "detection_range", "vertical_tolerance", "jump_power", "edge_padding",
+)
+ENEMY_INT_FIELDS = (
+    "direction", "attack_cooldown", "attack_cooldown_timer", "attack_timer", "attack_damage",
+    "jump_cooldown", "jump_timer", "patrol_timer",
+)
+# Fields a tick can change; these are written back to the Enemy objects
+ENEMY_SYNC_FIELDS = (
+    "x", "y", "prev_x", "prev_y", "velocity_x", "velocity_y", "direction",
+    "attack_cooldown_timer", "attack_timer", "jump_timer", "patrol_timer",
+)
+
+
+def trunc_int(values):
+    # pygame.Rect truncates float coordinates toward zero
+    return np.trunc(values).astype(np.int64)
+
+
+class EnemyBatch:
+    """
+    A room's enemies held in parallel NumPy arrays and advanced together.
+
+    Each tick reproduces Enemy.update plus GameSession.step's contact checks for every enemy in list
+    order, including the random draws: both outcomes of a patrol direction roll are
+    simulated and the draws are then taken enemy by enemy, so the random stream (and the
+    game) matches the per-object path exactly. The Enemy objects stay the source of truth
+    outside the batch; `sync` writes state back to them.
+    """
+
+    def __init__(self, enemies, grid):
+        self.enemies = enemies
+        self.grid = grid
+        self.count = len(enemies)
+        for field in ENEMY_FLOAT_FIELDS:
+            setattr(self, field, np.array([getattr(e, field) for e in enemies], dtype=np.float64))
+        for field in ENEMY_INT_FIELDS:
+            setattr(self, field, np.array([getattr(e, field) for e in enemies], dtype=np.int64))
+        self.state = np.array([ENEMY_STATES.index(e.state) for e in enemies], dtype=np.int64)
+        self.on_ground = np.array([e.on_ground for e in enemies], dtype=bool)
+        platform_index = {id(p): i for i, p in enumerate(grid.platforms)}
+        self.current_platform = np.array(
+            [platform_index.get(id(e.current_platform), -1) for e in enemies], dtype=np.int64
+        )
+        self.plat_x = np.array([p.x for p in grid.platforms], dtype=np.float64)
+        self.plat_y = np.array([p.y for p in grid.platforms], dtype=np.float64)
+        self.plat_w = np.array([p.width for p in grid.platforms], dtype=np.float64)
+        self.plat_h = np.array([p.height for p in grid.platforms], dtype=np.float64)
+        self.rect_x = np.array([r.x for r in grid.rects], dtype=np.int64)
+        self.rect_y = np.array([r.y for r in grid.rects], dtype=np.int64)
+        self.rect_w = np.array([r.width for r in grid.rects], dtype=np.int64)
+        self.rect_r = np.array([r.right for r in grid.rects], dtype=np.int64)
+        self.rect_b = np.array([r.bottom for r in grid.rects], dtype=np.int64)
+        self.rect_ok = np.array([r.width > 0 and r.height > 0 for r in grid.rects], dtype=bool)
+        self._near_platforms(None)
+        self.nav = grid.nav
+        if self.nav is not None:
+            self.nav_next = np.array(self.nav.next_node, dtype=np.int64)
+            self.nav_x = np.array(self.nav.waypoint_x, dtype=np.float64)
+            self.nav_jump = np.array(self.nav.jump, dtype=bool)
+
+    def __len__(self):
+        return self.count
+
+    # State transfer
+
+    def sync_positions(self):
+        for i, enemy in enumerate(self.enemies):
+            enemy.x = float(self.x[i])
+            enemy.y = float(self.y[i])
+            enemy.prev_x = float(self.prev_x[i])
+            enemy.prev_y = float(self.prev_y[i])
+
+    def sync(self):
+        platforms = self.grid.platforms
+        for i, enemy in enumerate(self.enemies):
+            for field in ENEMY_SYNC_FIELDS:
+                setattr(enemy, field, getattr(self, field)[i].item())
+            enemy.on_ground = bool(self.on_ground[i])
+            enemy.state = ENEMY_STATES[self.state[i]]
+            index = self.current_platform[i]
+            enemy.current_platform = platforms[index] if index >= 0 else None
+
+    def _save(self):
+        fields = ENEMY_FLOAT_FIELDS + ENEMY_INT_FIELDS + ("state", "on_ground", "current_platform")
+        return {field: getattr(self, field).copy() for field in fields}
+
+    def _restore(self, saved):
+        for field, values in saved.items():
+            setattr(self, field, values)
+
+    # Simulation
+
+    def _near_platforms(self, span):
+        """
+        Limit _overlaps to platforms an enemy whose x is within `span` can touch this tick
+        (all of them when `span` is None). The platforms keep their room order.
+        """
+        if span is None:
+            self.near = np.arange(len(self.rect_x))
+        else:
+            # Half an enemy's width plus a tick's movement, with room to spare
+            reach = float(self.width.max()) + 32 if self.count else 0
+            self.near = np.flatnonzero((self.rect_r > span[0] - reach) & (self.rect_x < span[1] + reach))
+        near = self.near
+        self.near_rects = (self.rect_x[near], self.rect_y[near], self.rect_r[near], self.rect_b[near], self.rect_ok[near])
+
+    def _overlaps(self, x, y, width, height, after):
+        """First platform (by room order, index > after) each enemy rect overlaps, or -1."""
+        near = self.near
+        if not len(near):
+            return np.full(len(x), -1, dtype=np.int64)
+        rect_x, rect_y, rect_r, rect_b, rect_ok = self.near_rects
+        left = trunc_int(x - width / 2)
+        top = trunc_int(y - height / 2)
+        right = left + trunc_int(width)
+        bottom = top + trunc_int(height)
+        hit = (
+            (left[:, None] < rect_r)
+            & (top[:, None] < rect_b)
+            & (right[:, None] > rect_x)
+            & (bottom[:, None] > rect_y)
+            & rect_ok
+        )
+        if after is not None:
+            hit &= near > after[:, None]
+        first = hit.argmax(axis=1)
+        return np.where(hit[np.arange(len(first)), first], near[first], -1)
+
+    def _near_edge(self, x, width, platform, padding):
+        has = platform >= 0
+        if not len(self.plat_x):
+            return has
+        index = np.where(has, platform, 0)
+        left_bound = self.plat_x[index] + padding
+        right_bound = self.plat_x[index] + self.plat_w[index] - padding
+        return has & ((x - width / 2 <= left_bound) | (x + width / 2 >= right_bound))
+
+    def _routes(self, sel, hunting, player):
+        """Enemy._route for the enemies in `sel`: (routed, waypoint_x, jump, source node)."""
+        node = np.where(self.on_ground[sel], self.current_platform[sel] + 1, -1)
+        target = self.nav.locate(player.x, player.y + player.height / 2)
+        source = np.maximum(node, 0)
+        routed = hunting & (node >= 0) & (node != target) & (self.nav_next[source, target] >= 0)
+        return routed, self.nav_x[source, target], self.nav_jump[source, target], node
+
+    def _move(self, sel, direction, move_speed, jump_timer, state, player_bottom, route):
+        """Enemy.update from the horizontal move to the jump check, for the enemies in `sel`."""
+        x = self.x[sel]
+        y = self.y[sel]
+        width = self.width[sel]
+        height = self.height[sel]
+        vx = self.velocity_x[sel]
+        on_ground = self.on_ground[sel]
+        jump_timer = jump_timer.copy()
+        prev_y = y.copy()
+        direction = direction.copy()
+
+        # Horizontal movement with acceleration
+        target_speed = move_speed * direction
+        air_control = np.where(on_ground, 1.0, 0.55)
+        vx = vx + self.acceleration[sel] * air_control * (target_speed - vx)
+        max_speed = move_speed * np.where(on_ground, 1.2, 0.9)
+        vx = np.maximum(-max_speed, np.minimum(max_speed, vx))
+        x = x + vx
+        if len(self.near):
+            # After the first hit the velocity is zero, so later hits cannot move the enemy again
+            hit = self._overlaps(x, y, width, height, None)
+            blocked = hit >= 0
+            index = np.where(blocked, hit, 0)
+            x = np.where(
+                blocked & (vx > 0),
+                self.rect_x[index] - width / 2,
+                np.where(blocked & (vx < 0), self.rect_x[index] + self.rect_w[index] + width / 2, x),
+            )
+            vx = np.where(blocked, 0.0, vx)
+
+        # Gravity and vertical collisions, resolved platform by platform in room order
+        vy = self.velocity_y[sel] + self.gravity[sel]
+        platform = np.full(len(x), -1, dtype=np.int64)
+        on_ground = np.zeros(len(x), dtype=bool)
+        pending = np.arange(len(x))
+        after = np.full(len(x), -1, dtype=np.int64)
+        prev_bottom = prev_y + height / 2
+        prev_top = prev_y - height / 2
+        bonk_timer = (self.jump_cooldown[sel] * 0.6).astype(np.int64)
+        while len(pending) and len(self.near):
+            hit = self._overlaps(x[pending], y[pending], width[pending], height[pending], after[pending])
+            found = hit >= 0
+            pending = pending[found]
+            if not len(pending):
+                break
+            hit = hit[found]
+            after[pending] = hit
+            top = self.plat_y[hit]
+            bottom = self.plat_y[hit] + self.plat_h[hit]
+            land = (prev_bottom[pending] <= top) & (vy[pending] >= 0)
+            bonk = ~land & (prev_top[pending] >= bottom) & (vy[pending] <= 0)
+            side = ~land & ~bonk
+            rows = pending[land]
+            y[rows] = top[land] - height[rows] / 2
+            vy[rows] = 0.0
+            on_ground[rows] = True
+            platform[rows] = hit[land]
+            rows = pending[bonk]
+            y[rows] = bottom[bonk] + height[rows] / 2
+            vy[rows] = 0.0
+            jump_timer[rows] = np.maximum(jump_timer[rows], bonk_timer[rows])
+            # Diagonal collision: x is still the post-horizontal-move x, so only the velocity resets
+            vx[pending[side]] = 0.0
+
+        # Clamp to ground
+        grounded = ~on_ground & (y + height / 2 >= GROUND_LEVEL)
+        y = np.where(grounded, GROUND_LEVEL - height / 2, y)
+        vy = np.where(grounded, 0.0, vy)
+        vx = np.where(grounded, vx * 0.8, vx)
+        on_ground |= grounded
+
+        # Keep in bounds
+        past_left = x - width / 2 < 0
+        room_width = self.grid.width
+        past_right = ~past_left & (x + width / 2 > room_width)
+        x = np.where(past_left, width / 2, np.where(past_right, room_width - width / 2, x))
+        direction[past_left] = 1
+        direction[past_right] = -1
+        vx = np.where(past_left | past_right, 0.0, vx)
+
+        # Jump decisions; patrol hops still need a random roll, taken later in list order
+        can_jump = on_ground & (jump_timer <= 0)
+        near_edge = self._near_edge(x, width, platform, 8)
+        hunting = (state == CHASE) | (state == ATTACK)
+        routed, route_x, route_jump, route_node = route
+        node = np.where(on_ground, platform + 1, -1)
+        takeoff = route_jump & (node == route_node) & (np.abs(x - route_x) <= NAV_TAKEOFF_TOLERANCE)
+        must_jump = can_jump & hunting & np.where(routed, takeoff, (player_bottom < y - 10) | near_edge)
+        may_hop = can_jump & ~hunting & near_edge
+        return {
+            "x": x,
+            "y": y,
+            "velocity_x": vx,
+            "velocity_y": vy,
+            "on_ground": on_ground,
+            "current_platform": platform,
+            "jump_timer": jump_timer,
+            "direction": direction,
+            "must_jump": must_jump,
+            "may_hop": may_hop,
+        }
+
+    def _advance(self, sel, player, player_alive):
+        """One tick of Enemy.update for the enemies in `sel` (ascending indices)."""
+        x = self.x[sel]
+        y = self.y[sel]
+        self.prev_x[sel] = x
+        self.prev_y[sel] = y
+
+        jump_timer = self.jump_timer[sel]
+        jump_timer = np.where(jump_timer > 0, jump_timer - 1, jump_timer)
+
+        # _update_state
+        attack_timer = self.attack_timer[sel]
+        cooldown = self.attack_cooldown_timer[sel]
+        attacking = attack_timer > 0
+        state = np.full(len(sel), PATROL, dtype=np.int64)
+        state[attacking] = ATTACK
+        if player_alive:
+            dx = np.abs(player.x - x)
+            dy = np.abs(player.y - y)
+            start_attack = ~attacking & (dx <= self.attack_range[sel]) & (dy <= 60) & (cooldown <= 0)
+            chase = ~attacking & ~start_attack & (dx <= self.detection_range[sel]) & (dy <= self.vertical_tolerance[sel])
+            state[start_attack] = ATTACK
+            state[chase] = CHASE
+            attack_timer = np.where(start_attack, 30, attack_timer)
+
+        # _handle_attack_logic
+        counting = attack_timer > 0
+        attack_timer = np.where(counting, attack_timer - 1, attack_timer)
+        cooldown = np.where(
+            counting,
+            np.where(attack_timer <= 0, self.attack_cooldown[sel], cooldown),
+            np.where(cooldown > 0, cooldown - 1, cooldown),
+        )
+
+        move_speed = np.where(
+            state == CHASE,
+            self.chase_speed[sel],
+            np.where(state == ATTACK, self.attack_speed[sel], self.base_speed[sel]),
+        )
+
+        direction = self.direction[sel].copy()
+        width = self.width[sel]
+        route = (np.zeros(len(sel), dtype=bool), x, np.zeros(len(sel), dtype=bool), np.full(len(sel), -1))
+        if player_alive:
+            hunting = state != PATROL
+            target_x = player.x
+            if self.nav is not None:
+                route = self._routes(sel, hunting, player)
+                target_x = np.where(route[0], route[1], player.x)
+            dx = target_x - x
+            turn = hunting & (np.abs(dx) > 5)
+            direction = np.where(turn, np.where(dx > 0, 1, -1), direction)
+
+        # _handle_patrol_direction, minus the random roll
+        patrolling = (state == PATROL) & self.on_ground[sel]
+        patrol_timer = self.patrol_timer[sel] - patrolling
+        rolls = patrolling & (patrol_timer <= 0)
+        at_edge = patrolling & self._near_edge(x, width, self.current_platform[sel], self.edge_padding[sel])
+        direction = np.where(at_edge, -direction, direction)
+
+        player_bottom = player.y + player.height / 2
+        kept = self._move(sel, direction, move_speed, jump_timer, state, player_bottom, route)
+        roll_rows = np.flatnonzero(rolls)
+        flipped = None
+        if len(roll_rows):
+            flipped = self._move(
+                sel[roll_rows],
+                -direction[roll_rows],
+                move_speed[roll_rows],
+                jump_timer[roll_rows],
+                state[roll_rows],
+                player_bottom,
+                tuple(values[roll_rows] for values in route),
+            )
+
+        # Random draws in list order: patrol roll (if due), then patrol hop (if possible)
+        use_flipped = np.zeros(len(sel), dtype=bool)
+        hop = np.zeros(len(sel), dtype=bool)
+        roll_slot = {row: k for k, row in enumerate(roll_rows.tolist())}
+        for row in np.flatnonzero(rolls | kept["may_hop"]).tolist():
+            may_hop = kept["may_hop"][row]
+            if row in roll_slot:
+                if random.random() < 0.4:
+                    use_flipped[row] = True
+                    may_hop = flipped["may_hop"][roll_slot[row]]
+                patrol_timer[row] = random.randint(60, 180)
+            if may_hop and random.random() < 0.15:
+                hop[row] = True
+
+        result = kept
+        if flipped is not None and use_flipped.any():
+            chosen = roll_rows[use_flipped[roll_rows]]
+            slots = use_flipped[roll_rows]
+            for field, values in flipped.items():
+                result[field][chosen] = values[slots]
+
+        jump = result["must_jump"] | hop
+        self.x[sel] = result["x"]
+        self.y[sel] = result["y"]
+        self.velocity_x[sel] = result["velocity_x"]
+        self.velocity_y[sel] = np.where(jump, self.jump_power[sel], result["velocity_y"])
+        self.on_ground[sel] = result["on_ground"] & ~jump
+        self.current_platform[sel] = np.where(jump, -1, result["current_platform"])
+        self.jump_timer[sel] = np.where(jump, self.jump_cooldown[sel], result["jump_timer"])
+        self.direction[sel] = result["direction"]
+        self.state[sel] = state
+        self.attack_timer[sel] = attack_timer
+        self.attack_cooldown_timer[sel] = cooldown
+        self.patrol_timer[sel] = patrol_timer
+
+    def _contacts(self, sel, player, prev_player_y):
+        """GameSession.step's stomp / damage checks in list order. Returns (killed, index the player died at)."""
+        killed = []
+        if not player.alive or not len(sel):
+            return killed, None
+        player_rect = player.get_rect()
+        left = trunc_int(self.x[sel] - self.width[sel] / 2)
+        top = trunc_int(self.y[sel] - self.height[sel] / 2)
+        touching = (
+            (left < player_rect.right)
+            & (top < player_rect.bottom)
+            & (left + trunc_int(self.width[sel]) > player_rect.left)
+            & (top + trunc_int(self.height[sel]) > player_rect.top)
+            & (player_rect.width > 0)
+            & (player_rect.height > 0)
+        )
+        for i in sel[touching].tolist():
+            # Consider it a stomp if player's previous bottom was above enemy top and player is falling
+            player_prev_bottom = prev_player_y + player.height / 2
+            enemy_top = self.y[i] - self.height[i] / 2
+            if player_prev_bottom <= enemy_top and player.velocity_y > 0:
+                killed.append(i)
+                player.velocity_y = player.initial_jump_power
+            else:
+                knockback = -8 if player.x < self.x[i] else 8
+                player.take_damage(int(self.attack_damage[i]), knockback)
+                if not player.alive:
+                    return killed, i
+        return killed, None
+
+    def step(self, player, prev_player_y, span=None):
+        """
+        Advance the enemies one tick and resolve contacts. Returns True if the player died.
+        With a `span`, only enemies whose x lies within it move; the rest sleep.
+        """
+        if not self.count:
+            return False
+        player_alive = player.alive
+        if span is None:
+            everyone = np.arange(self.count)
+        else:
+            everyone = np.flatnonzero((self.x >= span[0]) & (self.x <= span[1]))
+            if not len(everyone):
+                return False
+        self._near_platforms(span)
+        fragile = player_alive and player.invuln_timer <= 0 and player.health <= int(self.attack_damage.max())
+        if fragile:
+            saved = self._save()
+            rng_state = random.getstate()
+            player_state = (player.velocity_x, player.velocity_y, player.health, player.invuln_timer, player.alive)
+
+        self._advance(everyone, player, player_alive)
+        killed, died_at = self._contacts(everyone, player, prev_player_y)
+        if died_at is not None and died_at < everyone[-1]:
+            # Enemies after the killing blow must see a dead player: replay the tick in two parts
+            self._restore(saved)
+            random.setstate(rng_state)
+            player.velocity_x, player.velocity_y, player.health, player.invuln_timer, player.alive = player_state
+            before, after = everyone[everyone <= died_at], everyone[everyone > died_at]
+            self._advance(before, player, True)
+            killed, _ = self._contacts(before, player, prev_player_y)
+            self._advance(after, player, False)
+        if killed:
+            self._remove(killed)
+        return died_at is not None
+
+    def _remove(self, indices):
+        keep = np.ones(self.count, dtype=bool)
+        keep[indices] = False
+        for i in sorted(indices, reverse=True):
+            enemy = self.enemies.pop(i)
+            enemy.take_damage()
+        for field in ENEMY_FLOAT_FIELDS + ENEMY_INT_FIELDS + ("state", "on_ground", "current_platform"):
+            setattr(self, field, getattr(self, field)[keep])
+        self.count = int(keep.sum())
+
 
 # Room and enemy loading functions (implementation)
+# Default room layouts as (x, y, width, height) platforms
+DEFAULT_ROOM_LAYOUTS = (
+    # Room 0 - Progressive path
+    ((80, 480, 240, 32), (500, 450, 180, 25), (120, 400, 200, 28), (600, 350, 160, 22), (200, 300, 140, 20)),
+    # Room 1 - Zigzag pattern
+    ((100, 480, 220, 30), (580, 450, 250, 33), (50, 400, 120, 18), (500, 350, 190, 26), (150, 300, 130, 19)),
+    # Room 2 - Staircase
+    ((60, 500, 230, 31), (120, 400, 100, 15), (200, 300, 280, 34), (580, 250, 150, 21)),
+    # Room 3 - Circular spread
+    (
+        (350, 480, 260, 32), (50, 450, 120, 18), (650, 450, 180, 24),
+        (120, 400, 220, 29), (250, 350, 190, 25), (400, 300, 200, 26),
+    ),
+    # Room 4 - Mixed pattern
+    ((80, 500, 230, 31), (560, 480, 250, 33), (150, 450, 110, 17), (600, 420, 210, 29), (220, 300, 280, 34)),
+)
+
+
 def get_default_rooms():
     """Return default room layouts."""
-    return [
-        # Room 0 - Progressive path
-        Room([
-            Platform(80, 480, 240, 32),
-            Platform(500, 450, 180, 25),
-            Platform(120, 400, 200, 28),
-            Platform(600, 350, 160, 22),
-            Platform(200, 300, 140, 20),
-        ]),
-        # Room 1 - Zigzag pattern
-        Room([
-            Platform(100, 480, 220, 30),
-            Platform(580, 450, 250, 33),
-            Platform(50, 400, 120, 18),
-            Platform(500, 350, 190, 26),
-            Platform(150, 300, 130, 19),
-        ]),
-        # Room 2 - Staircase
-        Room([
-            Platform(60, 500, 230, 31),
-            Platform(120, 400, 100, 15),
-            Platform(200, 300, 280, 34),
-            Platform(580, 250, 150, 21),
-        ]),
-        # Room 3 - Circular spread
-        Room([
-            Platform(350, 480, 260, 32),
-            Platform(50, 450, 120, 18),
-            Platform(650, 450, 180, 24),
-            Platform(120, 400, 220, 29),
-            Platform(250, 350, 190, 25),
-            Platform(400, 300, 200, 26),
-        ]),
-        # Room 4 - Mixed pattern
-        Room([
-            Platform(80, 500, 230, 31),
-            Platform(560, 480, 250, 33),
-            Platform(150, 450, 110, 17),
-            Platform(600, 420, 210, 29),
-            Platform(220, 300, 280, 34),
-        ]),
-    ]
-
-
-def _load_rooms_from_config_impl():
-    """Load rooms from config or return default rooms."""
-    rooms_data = GAME_CONFIG.get("rooms")
-    
-    if not rooms_data or not isinstance(rooms_data, list):
-        return get_default_rooms()
-    
-    # Load rooms from config
-    rooms = []
+    return [build_room(layout) for layout in DEFAULT_ROOM_LAYOUTS]
+
+
+# Compiled rooms shipped next to main.py by the build pipeline (build-service/levels.py)
+LEVEL_PACK_PATH = Path(__file__).with_name("levels.bin")
+LEVEL_PACK_MAGIC = b"KYXL"
+LEVEL_PACK_VERSION = 1
+LEVEL_PACK_HEADER = struct.Struct("<4sHHI")
+LEVEL_PACK_COLUMN = struct.Struct("<cI")
+LEVEL_PACK_COLUMNS = 9
+
+
+def load_level_pack(path=LEVEL_PACK_PATH):
+    """
+    Rooms from a compiled level pack as (layouts, enemy lists), or None without a usable pack.
+    The pack's column arrays are read with array.frombytes and split per room by their
+    running totals; see build-service/levels.py for the layout.
+    """
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        magic, version, _, count = LEVEL_PACK_HEADER.unpack_from(data)
+        if magic != LEVEL_PACK_MAGIC or version != LEVEL_PACK_VERSION or count != LEVEL_PACK_COLUMNS:
+            print(f"Warning: {path.name} is not a version {LEVEL_PACK_VERSION} level pack; using JSON rooms", file=sys.stderr)
+            return None
+        offset = LEVEL_PACK_HEADER.size
+        columns = []
+        for _ in range(count):
+            typecode, length = LEVEL_PACK_COLUMN.unpack_from(data, offset)
+            offset += LEVEL_PACK_COLUMN.size
+            items = array(typecode.decode("ascii"))
+            end = offset + length * items.itemsize
+            if end > len(data):
+                raise ValueError("truncated")
+            items.frombytes(data[offset:end])
+            if sys.byteorder == "big":
+                items.byteswap()
+            columns.append(items)
+            offset = end
+    except (struct.error, ValueError):
+        print(f"Warning: {path.name} is damaged; using JSON rooms", file=sys.stderr)
+        return None
+
+    platform_end, xs, ys, widths, heights, enemy_end, enemy_x, enemy_y, enemy_speed = columns
+    layouts = []
+    start = 0
+    for end in platform_end:
+        layouts.append(tuple(zip(xs[start:end], ys[start:end], widths[start:end], heights[start:end])))
+        start = end
+    enemy_lists = []
+    start = 0
+    for end in enemy_end:
+        # NaN marks an enemy without its own speed
+        enemy_lists.append([
+            (x, y, None if speed != speed else speed)
+            for x, y, speed in zip(enemy_x[start:end], enemy_y[start:end], enemy_speed[start:end])
+        ])
+        start = end
+    return layouts, enemy_lists
+
+
+def _parse_config_rooms(rooms_data):
+    """
+    (layouts of rooms with platforms or solid tiles, enemy lists by config position) from
+    the config's JSON rooms. A room with "tiles" rows is a scrolling TileMap room.
+    """
+    if not isinstance(rooms_data, list):
+        return [], []
+    layouts = []
+    enemy_lists = []
     for room_data in rooms_data:
-        platforms_data = room_data.get("platforms", [])
-        platforms = []
-        for p in platforms_data:
-            if all(k in p for k in ("x", "y", "width", "height")):
-                platforms.append(Platform(p["x"], p["y"], p["width"], p["height"]))
-        if platforms:  # Only add room if it has platforms
-            rooms.append(Room(platforms))
-    
-    return rooms if rooms else get_default_rooms()
+        if "tiles" in room_data:
+            tilemap = TileMap.from_config(room_data)
+            if tilemap is not None:
+                layouts.append(tilemap)
+        else:
+            platforms = tuple(
+                (p["x"], p["y"], p["width"], p["height"])
+                for p in room_data.get("platforms", [])
+                if all(k in p for k in ("x", "y", "width", "height"))
+            )
+            if platforms:  # Only add room if it has platforms
+                layouts.append(platforms)
+        enemy_lists.append([
+            (enemy_data["x"], enemy_data["y"], enemy_data.get("speed"))
+            for enemy_data in room_data.get("enemies", [])
+            if "x" in enemy_data and "y" in enemy_data
+        ])
+    return layouts, enemy_lists
+
+
+def _load_room_specs_from_config():
+    """Room specs from the compiled level pack, else the config's JSON rooms, else the defaults."""
+    packed = load_level_pack()
+    layouts, enemy_lists = packed if packed is not None else _parse_config_rooms(GAME_CONFIG.get("rooms"))
+    if not layouts:
+        layouts = list(DEFAULT_ROOM_LAYOUTS)
+
+    specs = []
+    for i, layout in enumerate(layouts):
+        # Enemies are matched to rooms by config position, as they always have been
+        enemies = [
+            (x, y, ENEMY_BASE_SPEED if speed is None else speed)
+            for x, y, speed in (enemy_lists[i] if i < len(enemy_lists) else ())
+        ]
+        # If no enemies in config, create default enemy
+        if not enemies:
+            x, y, width, _ = layout.solid_rects()[0] if isinstance(layout, TileMap) else layout[0]
+            enemies.append((x + width / 2, y - 18, ENEMY_BASE_SPEED))
+        specs.append((layout, tuple(enemies)))
+    return specs
+
+
+# Rough resident cost of a built room's parts, measured with tracemalloc
+ROOM_BASE_BYTES = 2048
+ROOM_PLATFORM_BYTES = 800
+ROOM_NAV_ENTRY_BYTES = 24
+ROOM_ENEMY_BYTES = 1700
+# Built rooms away from the player are evicted to saved state while their estimated total exceeds this
+ROOM_MEMORY_BUDGET_KB = max(0, int(TUNING_CONFIG.get("roomMemoryBudgetKb", 1024)))
+# Enemy state an evicted room keeps; everything else is rebuilt from the room's spec
+ENEMY_SAVED_FIELDS = ENEMY_SYNC_FIELDS + ("on_ground", "state")
+
+
+class RoomEnemies:
+    """`enemies_by_room`-style view of a RoomStore: indexing builds the room if needed."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        return self.store.built(index)[1]
+
+    def __setitem__(self, index, enemies):
+        self.store.install(index, self.store.built(index)[0], enemies)
+
+
+class RoomStore:
+    """
+    The world's rooms, built from their specs when first used.
+
+    Startup parses specs and draws each enemy's patrol timer in the order the eager loader
+    did, so seeded runs and recordings are unchanged. Each unbuilt room holds one record per
+    enemy, `(x, y, speed, patrol_timer, state)`, where `state` is None until the room has been
+    built and later evicted; an evicted room keeps ENEMY_SAVED_FIELDS plus its enemies'
+    platform indices. Indexing returns the Room, `enemies` the per-room enemy lists.
+    """
+
+    def __init__(self, specs, budget_kb=ROOM_MEMORY_BUDGET_KB):
+        self.layouts = [layout for layout, _ in specs]
+        self.saved = {
+            index: [(x, y, speed, random.randint(90, 180), None) for x, y, speed in enemies]
+            for index, (_, enemies) in enumerate(specs)
+        }
+        self.rooms = {}
+        self.budget = budget_kb * 1024
+        self.enemies = RoomEnemies(self)
+
+    @classmethod
+    def from_rooms(cls, rooms, enemies_by_room):
+        """A store over rooms that are already built."""
+        store = cls([((), ())] * len(rooms))
+        for index, (room, enemies) in enumerate(zip(rooms, enemies_by_room)):
+            store.install(index, room, enemies)
+        return store
+
+    def __len__(self):
+        return len(self.layouts)
+
+    def __getitem__(self, index):
+        return self.built(index)[0]
+
+    def __setitem__(self, index, room):
+        self.install(index, room, self.built(index)[1])
+
+    def is_built(self, index):
+        return index in self.rooms
+
+    def built(self, index):
+        """(Room, enemies) for a room, building it from its spec or saved state if needed."""
+        entry = self.rooms.get(index)
+        if entry is None:
+            room = build_room(self.layouts[index])
+            enemies = [self._restore(record, room.platforms) for record in self.saved.pop(index)]
+            entry = self.rooms[index] = (room, enemies)
+        return entry
+
+    def install(self, index, room, enemies):
+        if isinstance(room, TileRoom):
+            self.layouts[index] = room.tilemap
+        else:
+            self.layouts[index] = tuple((p.x, p.y, p.width, p.height) for p in room.platforms)
+        self.saved.pop(index, None)
+        self.rooms[index] = (room, enemies)
+
+    def evict(self, index):
+        """Drop a built room, keeping only what its enemies need to carry on."""
+        room, enemies = self.rooms.pop(index)
+        platform_index = {id(p): i for i, p in enumerate(room.platforms)}
+        self.saved[index] = [
+            (
+                enemy.x,
+                enemy.y,
+                enemy.speed,
+                enemy.patrol_timer,
+                tuple(getattr(enemy, field) for field in ENEMY_SAVED_FIELDS)
+                + (platform_index.get(id(enemy.current_platform), -1),),
+            )
+            for enemy in enemies
+        ]
 
+    @staticmethod
+    def _restore(record, platforms):
+        x, y, speed, patrol_timer, state = record
+        enemy = Enemy(x, y, speed=speed, patrol_timer=patrol_timer)
+        if state is not None:
+            for field, value in zip(ENEMY_SAVED_FIELDS, state):
+                setattr(enemy, field, value)
+            enemy.current_platform = platforms[state[-1]] if state[-1] >= 0 else None
+        return enemy
+
+    def footprint(self, index):
+        """Estimated bytes held by a built room."""
+        room, enemies = self.rooms[index]
+        size = ROOM_BASE_BYTES + ROOM_PLATFORM_BYTES * len(room.platforms) + ROOM_ENEMY_BYTES * len(enemies)
+        if room.grid.nav is not None:
+            size += ROOM_NAV_ENTRY_BYTES * len(room.grid.nav.surfaces) ** 2
+        return size
+
+    def prefetch(self, indices):
+        """Build the first unbuilt room among `indices`. Returns True if one was built."""
+        for index in indices:
+            if index not in self.rooms:
+                self.built(index)
+                return True
+        return False
+
+    def evict_far(self, center, keep=()):
+        """Evict rooms outside `keep`, farthest from `center` first, until built rooms fit the budget."""
+        total = sum(self.footprint(index) for index in self.rooms)
+        if total <= self.budget:
+            return 0
+        count = len(self)
+
+        def distance(index):
+            gap = abs(index - center)
+            return min(gap, count - gap)
+
+        evicted = 0
+        for index in sorted((i for i in self.rooms if i not in keep), key=distance, reverse=True):
+            if total <= self.budget:
+                break
+            total -= self.footprint(index)
+            self.evict(index)
+            evicted += 1
+        return evicted
+
+    def enemy_rows(self, index):
+        """Snapshot rows `[x, y, velocity_x, velocity_y, state, alive]` without building the room."""
+        if index in self.rooms:
+            return [
+                [enemy.x, enemy.y, enemy.velocity_x, enemy.velocity_y, enemy.state, enemy.alive]
+                for enemy in self.rooms[index][1]
+            ]
+        rows = []
+        for x, y, _, _, state in self.saved[index]:
+            if state is None:
+                rows.append([x, y, 0, 0, "patrol", True])
+            else:
+                saved = dict(zip(ENEMY_SAVED_FIELDS, state))
+                rows.append([saved["x"], saved["y"], saved["velocity_x"], saved["velocity_y"], saved["state"], True])
+        return rows
 
-def _load_enemies_from_config_impl(rooms):
-    """Load enemies from config or create default enemies."""
-    rooms_data = GAME_CONFIG.get("rooms")
-    enemies_by_room = []
-    
-    for i, room in enumerate(rooms):
-        room_enemies = []
-        
-        # Try to load enemies from config
-        if rooms_data and i < len(rooms_data):
-            room_data = rooms_data[i]
-            enemies_data = room_data.get("enemies", [])
-            
-            for enemy_data in enemies_data:
-                if "x" in enemy_data and "y" in enemy_data:
-                    speed = enemy_data.get("speed", ENEMY_BASE_SPEED)
-                    room_enemies.append(Enemy(enemy_data["x"], enemy_data["y"], speed=speed))
-        
-        # If no enemies in config, create default enemy
-        if not room_enemies:
-            if room.platforms:
-                p = room.platforms[0]
-                ex = p.x + p.width / 2
-                ey = p.y - 18
+    def enemy_count(self):
+        return sum(len(self.rooms[i][1]) if i in self.rooms else len(self.saved[i]) for i in range(len(self)))
+
+
+def draw_interpolated(screen, entity, alpha, offset_x=0):
+    """Draw an entity `alpha` of the way from its previous tick position to its current one."""
+    x, y = entity.x, entity.y
+    if alpha < 1:
+        entity.x = entity.prev_x + (x - entity.prev_x) * alpha
+        entity.y = entity.prev_y + (y - entity.prev_y) * alpha
+    entity.x -= offset_x
+    try:
+        entity.draw(screen)
+    finally:
+        entity.x, entity.y = x, y
+
+
+class Camera:
+    """
+    Horizontal scroll position for rooms wider than the screen.
+
+    The camera is simulation state: it eases toward the player each tick, and which enemies
+    are awake depends on where it is, so replays see the same camera. In screen-sized rooms
+    it stays at 0.
+    """
+
+    def __init__(self):
+        self.x = 0.0
+        self.prev_x = 0.0
+
+    def remember_position(self):
+        self.prev_x = self.x
+
+    @staticmethod
+    def _goal(target_x, room_width):
+        return min(max(target_x - WINDOW_WIDTH / 2, 0.0), max(0.0, room_width - WINDOW_WIDTH))
+
+    def follow(self, target_x, room_width):
+        goal = self._goal(target_x, room_width)
+        self.x += (goal - self.x) * CAMERA_FOLLOW_RATE
+        if abs(goal - self.x) < 0.5:
+            self.x = goal
+
+    def snap(self, target_x, room_width):
+        """Jump straight to `target_x`, as on entering a room."""
+        self.x = self.prev_x = self._goal(target_x, room_width)
+
+    def offset(self, alpha=1.0):
+        """Whole-pixel left edge of the view, `alpha` of the way through the current tick."""
+        return int(self.prev_x + (self.x - self.prev_x) * alpha)
+
+    def active_span(self, room_width):
+        """(low, high) x range of awake enemies, or None when the whole room is awake."""
+        if room_width <= WINDOW_WIDTH:
+            return None
+        return self.x - CAMERA_ACTIVE_MARGIN, self.x + WINDOW_WIDTH + CAMERA_ACTIVE_MARGIN
+
+
+class GameSession:
+    """Simulation state for one run; each `step` advances it by one fixed tick."""
+
+    def __init__(self):
+        self.player = Player(WINDOW_WIDTH / 2, GROUND_LEVEL - 30)
+        self.game_over = False
+
+        # Rooms from config (or defaults), built as the player gets near them
+        self.rooms = RoomStore(_load_room_specs_from_config())
+        self.current_room = 0
+        # Scroll position in rooms wider than the screen
+        self.camera = Camera()
+        # Tick each room's enemies were last brought up to date at
+        self.room_ticks = [0] * len(self.rooms)
+
+        self.fireflies = FireflySwarm()
+        self.ground_dust = DustPool()
+        self.ticks = 0
+        # EnemyBatch for the current room when it is crowded enough to batch
+        self.enemy_batch = None
+        # Player-versus-enemy contacts for rooms updated one Enemy at a time
+        self.broadphase = SweepAndPrune()
+        # A FrameProfiler while profiling, else None
+        self.profiler = None
+
+    @property
+    def enemies_by_room(self):
+        return self.rooms.enemies
+
+    def prefetch_rooms(self):
+        """
+        Idle-time room upkeep: build one not-yet-built neighbour of the current room, and
+        evict far rooms while built rooms exceed the memory budget. Returns True if it did
+        any work. Rooms are rebuilt exactly as they were left, so calling this (or not)
+        never changes the simulation.
+        """
+        count = len(self.rooms)
+        current = self.current_room
+        nearby = (current, (current + 1) % count, (current - 1) % count)
+        built = self.rooms.prefetch(nearby)
+        return built or self.rooms.evict_far(current, nearby) > 0
+
+    def _enemy_batch(self, room_enemies, grid):
+        batch = self.enemy_batch
+        if batch is not None and batch.enemies is room_enemies:
+            return batch
+        self.release_enemy_batch()
+        if np is None or ENEMY_BATCH_THRESHOLD <= 0 or len(room_enemies) < ENEMY_BATCH_THRESHOLD:
+            return None
+        self.enemy_batch = EnemyBatch(room_enemies, grid)
+        return self.enemy_batch
+
+    def catch_up_room(self, room_index, now):
+        """Fast-forward a room the player is not in to tick `now`."""
+        elapsed = now - self.room_ticks[room_index]
+        if elapsed <= 0:
+            return
+        grid = self.rooms[room_index].grid
+        for enemy in self.enemies_by_room[room_index]:
+            enemy.fast_forward(grid, elapsed)
+        self.room_ticks[room_index] = now
+
+    def _schedule_offscreen_rooms(self):
+        """Level of detail: neighbours of the active room are caught up every few ticks, staggered."""
+        interval = ADJACENT_ROOM_TICK_INTERVAL
+        count = len(self.rooms)
+        if not interval or count < 2:
+            return
+        now = self.ticks + 1
+        for room_index in {(self.current_room - 1) % count, (self.current_room + 1) % count}:
+            if room_index != self.current_room and (now + room_index) % interval == 0:
+                self.catch_up_room(room_index, now)
+
+    def release_enemy_batch(self):
+        """Write batched enemy state back to the Enemy objects and drop the batch."""
+        if self.enemy_batch is not None:
+            self.enemy_batch.sync()
+            self.enemy_batch = None
+
+    def step(self, keys):
+        player = self.player
+        rooms = self.rooms
+        profiler = self.profiler
+        camera = self.camera
+        player.remember_position()
+        camera.remember_position()
+
+        # Keep previous player y for stomp detection
+        prev_player_y = player.y
+
+        # Update player and check for room transitions
+        room_change = player.update(keys, rooms[self.current_room].grid, self.ground_dust)
+        if not player.alive:
+            self.game_over = True
+
+        # Handle room transitions
+        if room_change != 0 and not self.game_over:
+            new_room = self.current_room + room_change
+            # Wrap around rooms (loop from last to first and vice versa)
+            # Only the active room keeps a baked static layer
+            rooms[self.current_room].invalidate_static_layer()
+            if new_room < 0:
+                self.current_room = len(rooms) - 1
+            elif new_room >= len(rooms):
+                self.current_room = 0
             else:
-                ex = WINDOW_WIDTH / 2
-                ey = GROUND_LEVEL - 18
-            room_enemies.append(Enemy(ex, ey))
-        
-        enemies_by_room.append(room_enemies)
-    
-    return enemies_by_room
+                self.current_room = new_room
+            if room_change < 0:
+                # Enter at the right edge of the new room, however wide it is
+                player.x = rooms[self.current_room].width - player.width / 2 - 10
+            # The player wrapped to the far edge; don't interpolate across the screen
+            player.remember_position()
+            camera.snap(player.x, rooms[self.current_room].width)
+            if ADJACENT_ROOM_TICK_INTERVAL:
+                # A distant room has been frozen since it was last in range
+                self.catch_up_room(self.current_room, self.ticks)
+        room = rooms[self.current_room]
+        camera.follow(player.x, room.width)
+        if profiler:
+            profiler.lap("player")
+
+        # Update enemies in the current room; in a scrolling room only those near the view
+        room_enemies = self.enemies_by_room[self.current_room]
+        grid = room.grid
+        span = camera.active_span(room.width)
+        awake = room_enemies if span is None else [e for e in room_enemies if span[0] <= e.x <= span[1]]
+        batch = self._enemy_batch(room_enemies, grid)
+        if batch is not None:
+            if batch.step(player, prev_player_y, span):
+                self.game_over = True
+        elif player.alive and player.invuln_timer <= 0 and any(
+            player.health <= enemy.attack_damage for enemy in awake
+        ):
+            # One hit can kill the player, and enemies after that hit must see a dead
+            # player, so resolve contacts enemy by enemy as they update
+            for enemy in list(awake):
+                enemy.remember_position()
+                enemy.update(grid, player)
+                if player.alive and player.get_rect().colliderect(enemy.get_rect()):
+                    self._resolve_contact(enemy, prev_player_y, room_enemies)
+        else:
+            # Nothing an enemy update reads can change through a contact here, so all
+            # enemies move first and the broadphase reports contacts afterwards
+            for enemy in awake:
+                enemy.remember_position()
+                enemy.update(grid, player)
+            broadphase = self.broadphase
+            broadphase.update([("player", player)] + [("enemy", enemy) for enemy in awake])
+            touching = [enemy for _, enemy in broadphase.pairs()]
+            if touching and player.alive:
+                touching.sort(key=room_enemies.index)
+                for enemy in touching:
+                    self._resolve_contact(enemy, prev_player_y, room_enemies)
+        self.room_ticks[self.current_room] = self.ticks + 1
+        self._schedule_offscreen_rooms()
+        if profiler:
+            profiler.lap("enemies")
+
+        self.ground_dust.update()
+        # Fireflies tick with the simulation so their respawns draw from the random stream at fixed points
+        self.fireflies.update(SIM_STEP)
+        self.ticks += 1
+        if profiler:
+            profiler.lap("particles")
+
+    def _resolve_contact(self, enemy, prev_player_y, room_enemies):
+        """Stomp or take damage from an enemy the player overlaps."""
+        player = self.player
+        # Consider it a stomp if player's previous bottom was above enemy top and player is falling
+        player_prev_bottom = prev_player_y + player.height / 2
+        enemy_top = enemy.y - enemy.height / 2
+        if player_prev_bottom <= enemy_top and player.velocity_y > 0:
+            # Stomp: kill enemy and bounce player
+            enemy.take_damage()
+            player.velocity_y = player.initial_jump_power  # bounce up a bit
+            room_enemies.remove(enemy)
+        else:
+            # Taking damage from an enemy attack
+            knockback = -8 if player.x < enemy.x else 8
+            player.take_damage(enemy.attack_damage, knockback)
+            if not player.alive:
+                self.game_over = True
+
+    def snapshot(self):
+        """Plain-data view of the simulation state, used for digests and playtest reports."""
+        if self.enemy_batch is not None:
+            self.enemy_batch.sync()
+        player = self.player
+        return {
+            "tick": self.ticks,
+            "room": self.current_room,
+            "game_over": self.game_over,
+            "player": [
+                player.x,
+                player.y,
+                player.velocity_x,
+                player.velocity_y,
+                player.health,
+                player.alive,
+                player.dash_timer,
+                player.invuln_timer,
+            ],
+            # float() + 0.0 so the int/float and -0.0 differences between the object and
+            # batched enemy paths do not change the digest
+            "enemies": [
+                [
+                    [float(x) + 0.0, float(y) + 0.0, float(vx) + 0.0, float(vy) + 0.0, state, alive]
+                    for x, y, vx, vy, state, alive in self.rooms.enemy_rows(index)
+                ]
+                for index in range(len(self.rooms))
+            ],
+            "dust": len(self.ground_dust),
+            "fireflies": [
+                [float(x), float(y)] for x, y in zip(self.fireflies.x, self.fireflies.y)
+            ],
+        }
+
+    def digest(self):
+        # RNG state is part of the digest: two runs only match if they will keep matching
+        state = json.dumps(self.snapshot(), sort_keys=True, separators=(",", ":"))
+        rng = repr(random.getstate())
+        return hashlib.sha256((state + rng).encode("utf-8")).hexdigest()
+
+    def draw(self, screen, background, hud, elapsed, alpha=1.0):
+        profiler = self.profiler
+        background.draw_background(screen, elapsed, self.current_room)
+        if profiler:
+            profiler.lap("background")
+        self.fireflies.draw(screen)
+        if profiler:
+            profiler.lap("sprites")
+
+        # Ground and the current room's platforms (or the tile chunks in view)
+        camera_x = self.camera.offset(alpha)
+        self.rooms[self.current_room].draw_static(screen, camera_x)
+        if profiler:
+            profiler.lap("room")
+        self.ground_dust.draw(screen, camera_x)
+        # Draw the current room's enemies that are in view
+        if self.enemy_batch is not None:
+            self.enemy_batch.sync_positions()
+        left, right = camera_x - DRAW_CULL_MARGIN, camera_x + WINDOW_WIDTH + DRAW_CULL_MARGIN
+        for enemy in self.enemies_by_room[self.current_room]:
+            if left <= enemy.x <= right:
+                draw_interpolated(screen, enemy, alpha, camera_x)
+
+        # Draw player
+        draw_interpolated(screen, self.player, alpha, camera_x)
+        if profiler:
+            profiler.lap("sprites")
+
+        background.draw_mist(screen, elapsed)
+        if profiler:
+            profiler.lap("background")
+        hud.draw(screen, self.player, self.current_room, len(self.rooms))
+
+        if self.game_over:
+            hud.draw_game_over(screen)
+        if profiler:
+            profiler.lap("hud")
+
+
+# Every key the simulation reads; input state is a bitmask over this tuple
+INPUT_KEYS = (
+    pygame.K_a,
+    pygame.K_LEFT,
+    pygame.K_d,
+    pygame.K_RIGHT,
+    pygame.K_UP,
+    pygame.K_SPACE,
+    pygame.K_LSHIFT,
+    pygame.K_RSHIFT,
+    pygame.K_LCTRL,
+    pygame.K_RCTRL,
+    pygame.K_j,
+)
+INPUT_KEY_BITS = {key: 1 << i for i, key in enumerate(INPUT_KEYS)}
+# Action names used by input scripts, each mapped to the primary key for it
+SCRIPT_ACTIONS = {
+    "left": pygame.K_LEFT,
+    "right": pygame.K_RIGHT,
+    "jump": pygame.K_SPACE,
+    "run": pygame.K_LSHIFT,
+    "dash": pygame.K_j,
+}
+
+
+class KeyState:
+    """Stand-in for pygame.key.get_pressed() backed by an INPUT_KEYS bitmask."""
+
+    __slots__ = ("mask",)
+
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & INPUT_KEY_BITS.get(key, 0))
+
+    @classmethod
+    def from_pressed(cls, pressed):
+        mask = 0
+        for key, bit in INPUT_KEY_BITS.items():
+            if pressed[key]:
+                mask |= bit
+        return cls(mask)
+
+
+def actions_mask(actions):
+    mask = 0
+    for action in actions:
+        if action not in SCRIPT_ACTIONS:
+            raise ValueError(f"Unknown input action: {action}")
+        mask |= INPUT_KEY_BITS[SCRIPT_ACTIONS[action]]
+    return mask
+
+
+# Run right with jumps and dashes, then double back; loops for as long as the run lasts
+DEFAULT_INPUT_SCRIPT = [
+    [90, ["right"]],
+    [30, ["right", "jump"]],
+    [120, ["right", "run"]],
+    [1, ["right", "run", "dash"]],
+    [40, ["right"]],
+    [20, []],
+    [90, ["left", "run"]],
+    [25, ["left", "jump"]],
+    [60, ["right", "run", "jump"]],
+]
+
+
+class ScriptedInput:
+    """Cycles through `[ticks, [actions]]` segments, one KeyState per tick."""
+
+    def __init__(self, segments=None):
+        segments = DEFAULT_INPUT_SCRIPT if segments is None else segments
+        self.segments = [(int(ticks), KeyState(actions_mask(actions))) for ticks, actions in segments if int(ticks) > 0]
+        if not self.segments:
+            raise ValueError("Input script has no segments")
+        self.index = 0
+        self.remaining = self.segments[0][0]
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as script_file:
+            data = json.load(script_file)
+        return cls(data.get("segments") if isinstance(data, dict) else data)
+
+    def next(self):
+        if self.remaining == 0:
+            self.index = (self.index + 1) % len(self.segments)
+            self.remaining = self.segments[self.index][0]
+        self.remaining -= 1
+        return self.segments[self.index][1]
+
+
+RECORDING_VERSION = 1
+
+
+def config_hash():
+    """Digest of the merged game config (and level pack), so a replay can tell it is running against the same level."""
+    text = json.dumps(GAME_CONFIG, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(text.encode("utf-8"))
+    if LEVEL_PACK_PATH.exists():
+        digest.update(LEVEL_PACK_PATH.read_bytes())
+    return digest.hexdigest()
+
+
+def new_seed():
+    return int.from_bytes(os.urandom(4), "little")
+
+
+class InputRecording:
+    """Per-tick input masks stored as [count, mask] runs, with the seed and config they were played with."""
+
+    def __init__(self, seed, config=None, runs=None, digest=None):
+        self.seed = seed
+        self.config = config_hash() if config is None else config
+        self.runs = [list(run) for run in runs] if runs else []
+        self.digest = digest
+        self.ticks = sum(count for count, _ in self.runs)
+
+    def __len__(self):
+        return self.ticks
+
+    def append(self, mask):
+        runs = self.runs
+        if runs and runs[-1][1] == mask:
+            runs[-1][0] += 1
+        else:
+            runs.append([1, mask])
+        self.ticks += 1
+
+    def to_dict(self):
+        return {
+            "version": RECORDING_VERSION,
+            "seed": self.seed,
+            "config": self.config,
+            "simRate": SIM_RATE,
+            "keys": [pygame.key.name(key) for key in INPUT_KEYS],
+            "ticks": self.ticks,
+            "digest": self.digest,
+            "input": self.runs,
+        }
+
+    def save(self, path):
+        Path(path).write_text(json.dumps(self.to_dict(), separators=(",", ":")) + "\n", encoding="utf-8")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as recording_file:
+            data = json.load(recording_file)
+        if data.get("version") != RECORDING_VERSION:
+            raise ValueError(f"Unsupported recording version: {data.get('version')}")
+        return cls(data["seed"], data.get("config"), data.get("input"), data.get("digest"))
+
+    def playback(self):
+        return ReplayInput(self.runs)
+
+
+class ReplayInput:
+    """Feeds recorded masks back one tick at a time."""
+
+    def __init__(self, runs):
+        self.ticks = [(count, KeyState(mask)) for count, mask in runs]
+        self.index = 0
+        self.remaining = self.ticks[0][0] if self.ticks else 0
+
+    @property
+    def exhausted(self):
+        return self.remaining == 0 and self.index >= len(self.ticks) - 1
+
+    def next(self):
+        while self.remaining == 0:
+            self.index += 1
+            if self.index >= len(self.ticks):
+                raise IndexError("Replay has no more input")
+            self.remaining = self.ticks[self.index][0]
+        self.remaining -= 1
+        return self.ticks[self.index][1]
+
 
 # Main async function for pygbag compatibility
-async def main():
+async def main(seed=None, record_path=None, replay_path=None, profile_path=None, show_startup=STARTUP_REPORT):
     # Set up the display
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption(f"KYX · {STORY_CONFIG.get('title', 'Demo Build')}")
     clock = pygame.time.Clock()
-    
-    # Create player
-    player = Player(WINDOW_WIDTH / 2, GROUND_LEVEL - 30)
-    game_over = False
-    
-    # Load rooms and enemies from config (or defaults)
-    rooms = _load_rooms_from_config_impl()
-    enemies_by_room = _load_enemies_from_config_impl(rooms)
-    
-    # Current room index
-    current_room = 0
-    
+    startup_mark("display")
+
+    # Sessions are seeded explicitly so a recording can reproduce them
+    replay = None
+    if replay_path:
+        source = InputRecording.load(replay_path)
+        if source.config != config_hash():
+            print(f"Warning: {replay_path} was recorded with a different game config")
+        seed = source.seed
+        replay = source.playback()
+    elif seed is None:
+        seed = new_seed()
+    random.seed(seed)
+    recording = InputRecording(seed)
+
+    session = GameSession()
+    startup_mark("session")
+
     # Font for instructions
     font = pygame.font.Font(None, 24)
     font_large = pygame.font.Font(None, 64)
-
-    background_surface = build_vertical_gradient(WINDOW_WIDTH, WINDOW_HEIGHT, MIDNIGHT_BLUE, DEEP_NAVY)
-    fireflies = [Firefly() for _ in range(26)]
-    ground_dust = []
-    
-    # Game loop
+    hud = HUD(font, font_large)
+    profiler = FrameProfiler(pygame.font.Font(None, 18))
+    if PROFILER_ENABLED or profile_path:
+        profiler.start()
+    startup_mark("fonts")
+
+    background = BackgroundCompositor(
+        build_vertical_gradient(WINDOW_WIDTH, WINDOW_HEIGHT, MIDNIGHT_BLUE, DEEP_NAVY)
+    )
+    startup_mark("background")
+    SPRITE_ATLAS.load()
+    startup_mark("sprites")
+    first_frame = True
+
+    # Game loop: the simulation advances in fixed SIM_STEP ticks, rendering runs as fast as it can
+    accumulator = 0.0
     running = True
     while running:
+        frame_started = time.perf_counter()
+        session.profiler = profiler if profiler.active else None
+        if profiler.active:
+            profiler.begin_frame()
+
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-        
+            elif event.type == pygame.KEYDOWN and event.key == PROFILER_TOGGLE_KEY:
+                if profiler.active:
+                    # Toggling off prints the report; a browser tab never reaches the exit dump
+                    profiler.dump(profile_path)
+                profiler.toggle()
+
         # Get pressed keys
-        keys = pygame.key.get_pressed()
-        dt = clock.get_time() / 1000.0
+        keys = KeyState.from_pressed(pygame.key.get_pressed())
         elapsed = pygame.time.get_ticks() / 1000.0
-
-        # Keep previous player y for stomp detection
-        prev_player_y = player.y
-
-        # Update player and check for room transitions
-        room_change = player.update(keys, rooms[current_room].platforms, ground_dust)
-        if not player.alive:
-            game_over = True
-
-        # Handle room transitions
-        if room_change != 0 and not game_over:
-            new_room = current_room + room_change
-            # Wrap around rooms (loop from last to first and vice versa)
-            if new_room < 0:
-                current_room = len(rooms) - 1
-            elif new_room >= len(rooms):
-                current_room = 0
-            else:
-                current_room = new_room
-
-        # Update enemies in the current room
-        room_enemies = enemies_by_room[current_room]
-        for enemy in list(room_enemies):
-            enemy.update(rooms[current_room].platforms, player)
-
-            # Collision detection between player and enemy
-            if player.alive and player.get_rect().colliderect(enemy.get_rect()):
-                # Consider it a stomp if player's previous bottom was above enemy top and player is falling
-                player_prev_bottom = prev_player_y + player.height / 2
-                enemy_top = enemy.y - enemy.height / 2
-                if player_prev_bottom <= enemy_top and player.velocity_y > 0:
-                    # Stomp: kill enemy and bounce player
-                    enemy.take_damage()
-                    player.velocity_y = player.initial_jump_power  # bounce up a bit
-                else:
-                    # Taking damage from an enemy attack
-                    knockback = -8 if player.x < enemy.x else 8
-                    player.take_damage(enemy.attack_damage, knockback)
-                    if not player.alive:
-                        game_over = True
-
-            # Remove dead enemies
-            if not enemy.alive:
-                try:
-                    room_enemies.remove(enemy)
-                except ValueError:
-                    pass
-        
-        for particle in ground_dust[:]:
-            if not particle.update():
-                ground_dust.remove(particle)
-
-        for firefly in fireflies:
-            firefly.update(dt)
-
-        # Draw everything
-        screen.blit(background_surface, (0, 0))
-        draw_parallax_layers(screen, elapsed, current_room)
-        for firefly in fireflies:
-            firefly.draw(screen)
-        draw_ground(screen)
-
-        # Draw current room's platforms
-        rooms[current_room].draw(screen)
-        for particle in ground_dust:
-            particle.draw(screen)
-        # Draw enemies for the current room
-        for enemy in enemies_by_room[current_room]:
-            enemy.draw(screen)
-        
-        # Draw player
-        player.draw(screen)
-        
-        draw_mist_overlay(screen, elapsed)
-        draw_ui(screen, font, player, current_room, len(rooms))
-
-        if game_over:
-            overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 160))
-            screen.blit(overlay, (0, 0))
-            game_over_text = font_large.render(STORY_CONFIG.get("gameOverTitle", "Shade Dispersed"), True, PALE_GLOW)
-            screen.blit(
-                game_over_text,
-                (
-                    (WINDOW_WIDTH - game_over_text.get_width()) / 2,
-                    (WINDOW_HEIGHT - game_over_text.get_height()) / 2 - 20,
-                ),
-            )
-            hint_text = font.render(STORY_CONFIG.get("gameOverMessage", "The abyss reclaims your light..."), True, PALE_GLOW)
-            screen.blit(
-                hint_text,
-                (
-                    (WINDOW_WIDTH - hint_text.get_width()) / 2,
-                    (WINDOW_HEIGHT - hint_text.get_height()) / 2 + 30,
-                ),
-            )
+        accumulator += clock.get_time() / 1000.0
+        if session.profiler:
+            profiler.lap("input")
+
+        steps = 0
+        while accumulator >= SIM_STEP and steps < MAX_SIM_STEPS:
+            if replay is not None:
+                if replay.exhausted:
+                    running = False
+                    break
+                keys = replay.next()
+            recording.append(keys.mask)
+            session.step(keys)
+            accumulator -= SIM_STEP
+            steps += 1
+        if accumulator >= SIM_STEP:
+            # Too far behind (tab in background, long stall): drop the backlog rather than spiral
+            accumulator %= SIM_STEP
+
+        # Draw everything, interpolated between the last two ticks
+        session.draw(screen, background, hud, elapsed, accumulator / SIM_STEP)
+        if session.profiler:
+            profiler.draw(screen)
+            profiler.lap("overlay")
         
         # Update display
         pygame.display.flip()
+        if session.profiler:
+            profiler.lap("flip")
+            profiler.end_frame()
+        if first_frame:
+            first_frame = False
+            startup_mark("first frame")
+            if show_startup:
+                phases = ", ".join(f"{label} {ms:.1f}ms" for label, ms in startup_report().items())
+                print(f"Startup: {phases}", file=sys.stderr)
         
+        # Spare frame time goes to building nearby rooms before the player reaches them
+        if time.perf_counter() - frame_started < ROOM_PREFETCH_IDLE_SHARE / FPS:
+            session.prefetch_rooms()
+
         # Use async sleep for web compatibility
         await asyncio.sleep(0)
         clock.tick(FPS)
 
+    if profiler.frames:
+        profiler.dump(profile_path)
+    profiler.stop()
+
+    recording.digest = session.digest()
+    if record_path:
+        recording.save(record_path)
+        print(f"Recorded {len(recording)} ticks ({len(recording.runs)} input runs) to {record_path}")
+    if replay is not None:
+        result = "matches" if recording.digest == source.digest else "DIFFERS from"
+        print(f"Replay of {replay_path}: final state {result} the recording")
+
+
+def run_headless(ticks, seed=0, script=None, render=False, digest_every=0, recording=None, profiler=None):
+    """
+    Simulate `ticks` fixed steps as fast as possible with scripted input and return a report.
+    Nothing waits on a clock; with `render` every tick is also drawn to the (dummy) display.
+    Pass an InputRecording to capture the input that was played, or a FrameProfiler to time
+    each tick's phases.
+    """
+    random.seed(seed)
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    session = GameSession()
+    inputs = script if script is not None else ScriptedInput()
+    hud = background = None
+    if render:
+        hud = HUD(pygame.font.Font(None, 24), pygame.font.Font(None, 64))
+        background = BackgroundCompositor(
+            build_vertical_gradient(WINDOW_WIDTH, WINDOW_HEIGHT, MIDNIGHT_BLUE, DEEP_NAVY)
+        )
+
+    if profiler is not None:
+        profiler.start()
+        session.profiler = profiler
+
+    checkpoints = []
+    started = time.perf_counter()
+    for _ in range(ticks):
+        if profiler is not None:
+            profiler.begin_frame()
+        keys = inputs.next()
+        if recording is not None:
+            recording.append(keys.mask)
+        if profiler is not None:
+            profiler.lap("input")
+        session.step(keys)
+        session.prefetch_rooms()
+        if render:
+            session.draw(screen, background, hud, session.ticks * SIM_STEP)
+        if profiler is not None:
+            profiler.end_frame()
+        if digest_every and session.ticks % digest_every == 0:
+            checkpoints.append([session.ticks, session.digest()])
+    elapsed = time.perf_counter() - started
+    if profiler is not None:
+        profiler.stop()
+
+    snapshot = session.snapshot()
+    digest = session.digest()
+    if recording is not None:
+        recording.digest = digest
+    return {
+        "seed": seed,
+        "ticks": session.ticks,
+        "render": render,
+        "elapsed_s": elapsed,
+        "ticks_per_second": session.ticks / elapsed if elapsed > 0 else None,
+        "digest": digest,
+        "checkpoints": checkpoints,
+        "room": snapshot["room"],
+        "game_over": snapshot["game_over"],
+        "player_health": session.player.health,
+        "enemies_left": session.rooms.enemy_count(),
+    }
+
+
+def parse_args(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KYX demo platformer.")
+    parser.add_argument("--headless", action="store_true", help="Run without a window for playtesting and benchmarks.")
+    parser.add_argument("--ticks", type=int, default=3600, help="Headless: simulation ticks to run.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random module (headless default: 0).")
+    parser.add_argument("--script", type=Path, default=None, help="Headless: JSON input script of [ticks, [actions]] segments.")
+    parser.add_argument("--render", action="store_true", help="Headless: also draw every tick to the dummy display.")
+    parser.add_argument("--digest-every", type=int, default=0, help="Headless: record a state digest every N ticks.")
+    parser.add_argument("--json", type=Path, default=None, help="Headless: write the report to this file as well.")
+    parser.add_argument("--record", type=Path, default=None, help="Save the session's input as a replay file on exit.")
+    parser.add_argument("--replay", type=Path, default=None, help="Play back a replay file instead of live input.")
+    parser.add_argument("--profile", type=Path, default=None, help="Profile from the first frame and write the report here.")
+    parser.add_argument("--startup-report", action="store_true", help="Print startup phase timings after the first frame.")
+    # pygbag may pass arguments of its own; ignore anything unknown
+    return parser.parse_known_args(argv)[0]
+
+
+def headless_main(args):
+    recording = None
+    if args.replay:
+        source = InputRecording.load(args.replay)
+        if source.config != config_hash():
+            print(f"Warning: {args.replay} was recorded with a different game config", file=sys.stderr)
+        seed, ticks, script = source.seed, len(source), source.playback()
+    else:
+        seed = 0 if args.seed is None else args.seed
+        ticks = args.ticks
+        script = ScriptedInput.from_file(args.script) if args.script else None
+    if args.record:
+        recording = InputRecording(seed)
+    profiler = FrameProfiler() if args.profile else None
+
+    report = run_headless(ticks, seed, script, args.render, args.digest_every, recording, profiler)
+    if args.replay:
+        report["replay"] = str(args.replay)
+        report["expected_digest"] = source.digest
+        report["replay_matches"] = report["digest"] == source.digest
+    if recording is not None:
+        recording.save(args.record)
+        report["recorded_runs"] = len(recording.runs)
+    if profiler is not None:
+        profiler.dump(args.profile)
+    report["startup_ms"] = startup_report()
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json:
+        args.json.write_text(text + "\n", encoding="utf-8")
+    return 0 if report.get("replay_matches", True) else 1
+
+
+startup_mark("module")
+
 if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.headless:
+        sys.exit(headless_main(args))
     # For local testing, use asyncio.run()
     # When running with pygbag, it will handle async execution automatically
-    asyncio.run(main()) 
+    asyncio.run(main(args.seed, args.record, args.replay, args.profile, args.startup_report or STARTUP_REPORT))
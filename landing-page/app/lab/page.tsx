@@ -507,6 +507,14 @@ function MadlibLabPageContent() {
           backgroundTop: "#1e293b",
           backgroundBottom: "#0f172a",
         },
+        ...(playerSpriteUrl || enemySpriteUrl
+          ? {
+              sprites: {
+                ...(playerSpriteUrl ? { player: playerSpriteUrl } : {}),
+                ...(enemySpriteUrl ? { enemy: enemySpriteUrl } : {}),
+              },
+            }
+          : {}),
       };
 
       // Generate slug from hero name
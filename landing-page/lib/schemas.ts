@@ -8,9 +8,11 @@ const platformSchema = z.object({
   height: z.number(),
 });
 
-// Room definition with platforms
+// Room definition with platforms, or a scrolling tilemap ("#" marks a solid tile)
 const roomSchema = z.object({
-  platforms: z.array(platformSchema),
+  platforms: z.array(platformSchema).default([]),
+  tiles: z.array(z.string()).optional(),
+  tileSize: z.number().min(8).max(128).optional(),
   enemies: z
     .array(
       z.object({
@@ -23,6 +25,16 @@ const roomSchema = z.object({
     .optional(),
 });
 
+// Uploaded sprite: a URL, or a URL with the box (px) it is scaled to fit
+const spriteSchema = z.union([
+  z.string().url(),
+  z.object({
+    url: z.string().url(),
+    width: z.number().min(1).max(1024).optional(),
+    height: z.number().min(1).max(1024).optional(),
+  }),
+]);
+
 // Full game config schema
 export const gameConfigSchema = z.object({
   story: z.object({
@@ -57,6 +69,8 @@ export const gameConfigSchema = z.object({
     })
     .optional(),
   rooms: z.array(roomSchema).optional(),
+  // Packed into texture atlases when the demo template is built (build-service/atlas.py)
+  sprites: z.record(spriteSchema).optional(),
   mechanics: z
     .object({
       enableDash: z.boolean().optional(),
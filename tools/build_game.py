@@ -6,16 +6,27 @@ Usage:
 
 This will:
 1. Validate the provided JSON.
-2. Write it to demo-game/game_config.json.
+2. Write it to demo-game/game_config.json, with its rooms compiled into demo-game/levels.bin
+   and its sprites (URLs or paths relative to the config) packed into demo-game/sprites.json
+   and sprites-<n>.png atlas pages.
 3. Run `pygbag main.py` inside demo-game/ (unless --skip-build is passed).
-4. Copy demo-game/build/web into dist/<slug>/ so the bundle can be uploaded or embedded.
+4. Normalize demo-game/build/web (build-service/reproducible.py) and materialize it as
+   dist/<slug>/ so the bundle can be uploaded or embedded.
+
+Bundles are deduplicated: every file is stored once in dist/.objects/ under its
+SHA-256 digest and hardlinked into dist/<slug>/, with a per-slug manifest in
+dist/.manifests/<slug>.json. Objects are read-only because every slug that
+shares them points at the same inode. Pass --copy for a plain full copy.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
 import shutil
+import stat
 import subprocess
 import sys
 import time
@@ -24,8 +35,19 @@ from pathlib import Path
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEMO_DIR = REPO_ROOT / "demo-game"
 CONFIG_DEST = DEMO_DIR / "game_config.json"
+sys.path.insert(0, str(REPO_ROOT / "build-service"))
+
+from atlas import ATLAS_INDEX_NAME, split_sprite_atlas  # noqa: E402
+from levels import LEVEL_PACK_NAME, split_level_pack  # noqa: E402
+from reproducible import normalize_bundle  # noqa: E402
+
+LEVEL_PACK_DEST = DEMO_DIR / LEVEL_PACK_NAME
 BUILD_SRC = DEMO_DIR / "build" / "web"
 DEFAULT_DIST = REPO_ROOT / "dist"
+OBJECTS_DIRNAME = ".objects"
+MANIFESTS_DIRNAME = ".manifests"
+HASH_CHUNK_SIZE = 1 << 20
+OBJECT_MODE = 0o444
 
 
 def parse_args() -> argparse.Namespace:
@@ -53,6 +75,16 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Write the config but skip running pygbag (useful for dry runs).",
     )
+    parser.add_argument(
+        "--copy",
+        action="store_true",
+        help="Copy the bundle as-is instead of hardlinking from the object store.",
+    )
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="After materializing, delete stored objects no slug links to anymore.",
+    )
     return parser.parse_args()
 
 
@@ -63,10 +95,26 @@ def load_payload(path: Path) -> dict:
         return json.load(src)
 
 
-def write_config(data: dict) -> None:
+def write_config(data: dict, base_dir: Path | None = None) -> None:
     CONFIG_DEST.parent.mkdir(parents=True, exist_ok=True)
+    data, level_pack = split_level_pack(data)
+    data, atlas = split_sprite_atlas(data, base_dir)
     with CONFIG_DEST.open("w", encoding="utf-8") as dest:
         json.dump(data, dest, ensure_ascii=False, indent=2)
+    # A stale pack would override the rooms of the config just written
+    if level_pack is None:
+        LEVEL_PACK_DEST.unlink(missing_ok=True)
+    else:
+        LEVEL_PACK_DEST.write_bytes(level_pack)
+        print(f"Compiled rooms into {LEVEL_PACK_DEST} ({len(level_pack)} bytes)")
+    # Likewise a stale atlas would replace the procedural player and enemies
+    (DEMO_DIR / ATLAS_INDEX_NAME).unlink(missing_ok=True)
+    for page in DEMO_DIR.glob("sprites-*.png"):
+        page.unlink()
+    if atlas is not None:
+        for name, content in atlas.items():
+            (DEMO_DIR / name).write_bytes(content)
+        print(f"Packed sprites into {DEMO_DIR / ATLAS_INDEX_NAME} and {len(atlas) - 1} page(s)")
 
 
 def run_pygbag() -> None:
@@ -77,10 +125,127 @@ def run_pygbag() -> None:
     )
 
 
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as src:
+        for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_path(store: Path, digest: str) -> Path:
+    return store / digest[:2] / digest
+
+
+def ingest_object(store: Path, source: Path, digest: str) -> Path:
+    """Copy ``source`` into the object store unless its digest is already present."""
+    target = object_path(store, digest)
+    if target.exists():
+        # Removing a slug on Windows has to clear the bit on the shared inode; set it back
+        os.chmod(target, OBJECT_MODE)
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and rename so a crashed build never leaves a
+    # truncated object under a valid digest.
+    staging = target.with_name(f"{digest}.{os.getpid()}.tmp")
+    shutil.copyfile(source, staging)
+    os.chmod(staging, OBJECT_MODE)
+    os.replace(staging, target)
+    return target
+
+
+def _clear_readonly(func, path, _exc) -> None:
+    """rmtree error handler: Windows refuses to delete read-only files, so make them writable."""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def remove_tree(path: Path) -> None:
+    """``shutil.rmtree`` that also removes the read-only hardlinks of stored objects."""
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=_clear_readonly)
+    else:
+        shutil.rmtree(path, onerror=_clear_readonly)
+
+
+def link_or_copy(obj: Path, dest: Path) -> bool:
+    """Hardlink ``obj`` to ``dest``; fall back to a copy across filesystems."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(obj, dest)
+        return True
+    except OSError:
+        shutil.copyfile(obj, dest)
+        return False
+
+
+def materialize_bundle(source: Path, output_dir: Path, slug: str) -> tuple[int, int]:
+    """Store ``source`` in the content-addressed store and link it as ``output_dir/slug``.
+
+    Returns how many files were hardlinked and how many had to be copied.
+    """
+    store = output_dir / OBJECTS_DIRNAME
+    manifests = output_dir / MANIFESTS_DIRNAME
+    dest_dir = output_dir / slug
+    if dest_dir.exists():
+        remove_tree(dest_dir)
+    dest_dir.mkdir(parents=True)
+
+    files = {}
+    new_objects = 0
+    copied = 0
+    for path in sorted(p for p in source.rglob("*") if p.is_file()):
+        relative = path.relative_to(source).as_posix()
+        digest = hash_file(path)
+        if not object_path(store, digest).exists():
+            new_objects += 1
+        obj = ingest_object(store, path, digest)
+        if not link_or_copy(obj, dest_dir / relative):
+            copied += 1
+        files[relative] = {"sha256": digest, "size": path.stat().st_size}
+
+    manifest = {"slug": slug, "created_at": int(time.time()), "files": files}
+    manifests.mkdir(parents=True, exist_ok=True)
+    with (manifests / f"{slug}.json").open("w", encoding="utf-8") as dest:
+        json.dump(manifest, dest, indent=2, sort_keys=True)
+
+    print(
+        f"Stored {len(files)} files ({new_objects} new objects, "
+        f"{len(files) - new_objects} deduplicated, {copied} copied without hardlinks)"
+    )
+    return len(files) - copied, copied
+
+
+def collect_garbage(output_dir: Path) -> int:
+    """Remove objects that are no longer referenced by any slug manifest."""
+    store = output_dir / OBJECTS_DIRNAME
+    manifests = output_dir / MANIFESTS_DIRNAME
+    if not store.exists():
+        return 0
+
+    referenced = set()
+    for manifest_path in manifests.glob("*.json"):
+        slug = manifest_path.stem
+        if not (output_dir / slug).is_dir():
+            manifest_path.unlink()
+            continue
+        with manifest_path.open("r", encoding="utf-8") as src:
+            manifest = json.load(src)
+        referenced.update(entry["sha256"] for entry in manifest.get("files", {}).values())
+
+    removed = 0
+    for obj in store.glob("*/*"):
+        if obj.name not in referenced:
+            os.chmod(obj, stat.S_IWRITE)
+            obj.unlink()
+            removed += 1
+    return removed
+
+
 def main() -> None:
     args = parse_args()
     payload = load_payload(args.config)
-    write_config(payload)
+    write_config(payload, args.config.parent)
 
     if not args.skip_build:
         print("Running pygbag build...")
@@ -93,13 +258,28 @@ def main() -> None:
         raise FileNotFoundError(
             f"Expected pygbag output in {BUILD_SRC}. Run the build step first."
         )
+    # Same normalization as the build service, so identical inputs store identical objects
+    rewritten = normalize_bundle(BUILD_SRC)
+    print(f"Normalized {BUILD_SRC} ({rewritten} archives rewritten)")
 
     args.output_dir.mkdir(parents=True, exist_ok=True)
     dest_dir = args.output_dir / slug
-    if dest_dir.exists():
-        shutil.rmtree(dest_dir)
-    shutil.copytree(BUILD_SRC, dest_dir)
-    print(f"Bundle copied to {dest_dir}")
+    if args.copy:
+        if dest_dir.exists():
+            remove_tree(dest_dir)
+        shutil.copytree(BUILD_SRC, dest_dir)
+        (args.output_dir / MANIFESTS_DIRNAME / f"{slug}.json").unlink(missing_ok=True)
+        print(f"Bundle copied to {dest_dir}")
+    else:
+        linked, copied = materialize_bundle(BUILD_SRC, args.output_dir, slug)
+        if copied:
+            print(f"Bundle materialized at {dest_dir} ({linked} files linked, {copied} copied)")
+        else:
+            print(f"Bundle linked to {dest_dir}")
+
+    if args.gc:
+        removed = collect_garbage(args.output_dir)
+        print(f"Removed {removed} unreferenced objects")
 
 
 if __name__ == "__main__":
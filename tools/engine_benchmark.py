@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the demo game's update and draw paths.
+
+Usage:
+    python tools/engine_benchmark.py --json bench/engine-$(git rev-parse --short HEAD).json
+    python tools/engine_benchmark.py --sweep enemies --frames 300
+    python tools/engine_benchmark.py --compare bench/engine-baseline.json --fail-on-regression
+
+Each scene is a single synthetic room built from demo-game/main.py's own classes:
+N platforms, N enemies, a dust pool topped up to a fixed count every tick and
+a firefly swarm. Scenes with `tiles` set use a scrolling tilemap room that many
+tiles wide instead of the platforms, with one enemy per TILE_ENEMY_SPACING
+columns spread across it. The game runs headless on the SDL dummy driver with
+the built-in input script. Every frame times `GameSession.step` (update) and
+`GameSession.draw` (draw) separately. Scenes vary one axis at a time around a
+default scene, so each sweep isolates the cost of that axis.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEMO_DIR = REPO_ROOT / "demo-game"
+sys.path.insert(0, str(DEMO_DIR))
+
+import pygame  # noqa: E402
+
+import main as game  # noqa: E402
+
+DEFAULT_SCENE = {"platforms": 20, "enemies": 5, "dust": 40, "fireflies": 26, "tiles": 0}
+SWEEPS = {
+    "platforms": (5, 50, 200, 500, 2000),
+    "enemies": (1, 10, 50, 200, 500),
+    "dust": (0, 100, 500, 2000),
+    "fireflies": (0, 26, 200, 1000),
+    "tiles": (100, 1000, 10000),
+}
+SCENE_SEED = 1234
+# Tile scenes get one enemy per this many columns, so enemy density stays fixed as rooms widen
+TILE_ENEMY_SPACING = 10
+
+
+def build_scenes(sweeps: list[str]) -> dict[str, dict]:
+    scenes = {"default": dict(DEFAULT_SCENE)}
+    for axis in sweeps:
+        for value in SWEEPS[axis]:
+            scenes[f"{axis}-{value}"] = {**DEFAULT_SCENE, axis: value}
+            if axis == "tiles":
+                scenes[f"{axis}-{value}"]["enemies"] = value // TILE_ENEMY_SPACING
+    return scenes
+
+
+def build_tile_rows(columns: int, rng: random.Random) -> list[str]:
+    """Tilemap rows with ledges at random heights and a short wall every few screens."""
+    rows = [[" "] * columns for _ in range(12)]
+    column = 0
+    while column < columns:
+        width = rng.randint(3, 10)
+        row = rng.randint(3, len(rows) - 3)
+        rows[row][column : column + width] = "#" * len(rows[row][column : column + width])
+        column += width + rng.randint(2, 6)
+    for column in range(40, columns, 60):
+        rows[-1][column] = "#"
+    return ["".join(row) for row in rows]
+
+
+def build_session(params: dict) -> game.GameSession:
+    """A one-room GameSession populated with synthetic platforms, enemies, dust and fireflies."""
+    random.seed(SCENE_SEED)
+    session = game.GameSession()
+    rng = random.Random(SCENE_SEED)
+
+    if params["tiles"]:
+        room = game.TileRoom(game.TileMap(build_tile_rows(params["tiles"], rng)))
+    else:
+        platforms = []
+        for _ in range(params["platforms"]):
+            width = rng.randint(60, 180)
+            x = rng.randint(0, game.WINDOW_WIDTH - width)
+            y = rng.randint(120, game.GROUND_LEVEL - 40)
+            platforms.append(game.Platform(x, y, width, 20))
+        room = game.Room(platforms)
+    enemies = [
+        game.Enemy(rng.uniform(40, room.width - 40), game.GROUND_LEVEL - 18)
+        for _ in range(params["enemies"])
+    ]
+
+    session.rooms = game.RoomStore.from_rooms([room], [enemies])
+    session.current_room = 0
+    session.fireflies = game.FireflySwarm(params["fireflies"])
+    session.ground_dust = game.DustPool(max(1, params["dust"]))
+    # Keep the player alive however crowded the room gets, so every frame does the same work
+    session.player.invuln_duration = 10**9
+    session.player.invuln_timer = 10**9
+    return session
+
+
+def top_up_dust(session: game.GameSession, target: int, rng: random.Random) -> None:
+    dust = session.ground_dust
+    while len(dust) < target:
+        dust.spawn(rng.uniform(0, game.WINDOW_WIDTH), game.GROUND_LEVEL - 2, rng.choice((-1, 1)), rng.random() < 0.3)
+
+
+def describe(samples: list[float]) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "median_ms": statistics.median(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p95_ms": ms[min(len(ms) - 1, int(0.95 * (len(ms) - 1) + 0.5))],
+        "min_ms": ms[0],
+        "max_ms": ms[-1],
+    }
+
+
+def run_scene(params: dict, frames: int, warmup: int, screen, background, hud) -> dict:
+    session = build_session(params)
+    inputs = game.ScriptedInput()
+    rng = random.Random(SCENE_SEED + 1)
+    update_times, draw_times = [], []
+    perf = time.perf_counter
+
+    for frame in range(warmup + frames):
+        top_up_dust(session, params["dust"], rng)
+        keys = inputs.next()
+        started = perf()
+        session.step(keys)
+        updated = perf()
+        session.draw(screen, background, hud, session.ticks * game.SIM_STEP)
+        drawn = perf()
+        if frame >= warmup:
+            update_times.append(updated - started)
+            draw_times.append(drawn - updated)
+
+    return {
+        "params": params,
+        "update": describe(update_times),
+        "draw": describe(draw_times),
+        "enemies_left": len(session.enemies_by_room[0]),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list[str]:
+    """Return regressions where a scene's update or draw median grew by more than `threshold`."""
+    regressions = []
+    for scene, result in current["scenes"].items():
+        base_scene = baseline.get("scenes", {}).get(scene)
+        if not base_scene:
+            continue
+        for path in ("update", "draw"):
+            base = base_scene[path]["median_ms"]
+            now = result[path]["median_ms"]
+            delta = now - base
+            ratio = now / base if base else float("inf")
+            marker = ""
+            if ratio > 1 + threshold and delta > min_delta_ms:
+                marker = "  REGRESSION"
+                regressions.append(f"{scene}.{path}")
+            print(f"  {scene:<16} {path:<6} {base:8.3f}ms -> {now:8.3f}ms ({ratio - 1:+.1%}){marker}")
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the demo game's update and draw paths headless.")
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        default=",".join(SWEEPS),
+        help=f"Comma-separated axes to sweep (default: all of {', '.join(SWEEPS)}).",
+    )
+    parser.add_argument("--frames", type=int, default=240, help="Measured frames per scene.")
+    parser.add_argument("--warmup", type=int, default=30, help="Unmeasured frames per scene before timing.")
+    parser.add_argument("--json", type=Path, default=None, help="Write results to this JSON file.")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline JSON from an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that counts as a regression.")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore slowdowns smaller than this.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 when --compare finds regressions.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sweeps = [axis.strip() for axis in args.sweep.split(",") if axis.strip()]
+    for axis in sweeps:
+        if axis not in SWEEPS:
+            raise ValueError(f"Unknown sweep: {axis}")
+
+    screen = pygame.display.set_mode((game.WINDOW_WIDTH, game.WINDOW_HEIGHT))
+    hud = game.HUD(pygame.font.Font(None, 24), pygame.font.Font(None, 64))
+    background = game.BackgroundCompositor(
+        game.build_vertical_gradient(game.WINDOW_WIDTH, game.WINDOW_HEIGHT, game.MIDNIGHT_BLUE, game.DEEP_NAVY)
+    )
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": game.np.__version__ if game.np is not None else None,
+        "platform": platform.platform(),
+        "frames": args.frames,
+        "scenes": {},
+    }
+
+    print(f"Engine benchmark: commit={report['commit']} frames={args.frames} numpy={report['numpy']}")
+    print(f"  {'scene':<16} {'update p50':>11} {'p95':>8} {'draw p50':>10} {'p95':>8}")
+    for name, params in build_scenes(sweeps).items():
+        result = run_scene(params, args.frames, args.warmup, screen, background, hud)
+        report["scenes"][name] = result
+        print(
+            f"  {name:<16} {result['update']['median_ms']:9.3f}ms {result['update']['p95_ms']:6.3f}ms "
+            f"{result['draw']['median_ms']:8.3f}ms {result['draw']['p95_ms']:6.3f}ms"
+        )
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.json}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"Compared with {args.compare} (commit {baseline.get('commit', 'unknown')}, medians):")
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())